@@ -0,0 +1,207 @@
+import os
+import json
+import logging
+import threading
+import subprocess
+import tempfile
+from collections import OrderedDict
+
+# MPEG audio Layer III tables, indexed by the header fields
+_BITRATES = {
+    1: [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],  # MPEG-1
+    2: [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],      # MPEG-2 / 2.5
+}
+_SAMPLE_RATES = {
+    3: [44100, 48000, 32000],  # MPEG-1
+    2: [22050, 24000, 16000],  # MPEG-2
+    0: [11025, 12000, 8000],   # MPEG-2.5
+}
+
+
+class AudioInfo:
+    """Timing facts about an audio file, gathered once"""
+
+    def __init__(self, duration, sample_rate=None, chunk_offsets=None):
+        self.duration = duration
+        self.sample_rate = sample_rate
+        self.chunk_offsets = chunk_offsets or [0.0, duration]
+
+
+# Probed metadata per (path, size, mtime), shared by every handler in the process
+_info_cache = OrderedDict()
+_info_lock = threading.Lock()
+_MAX_CACHED_INFO = 256
+
+
+def _cache_key(path):
+    stat = os.stat(path)
+    return os.path.abspath(path), stat.st_size, stat.st_mtime_ns
+
+
+def register_audio_info(path, info):
+    """Record metadata a producer already knows so nobody has to probe the file"""
+    key = _cache_key(path)
+    with _info_lock:
+        _info_cache[key] = info
+        _info_cache.move_to_end(key)
+        while len(_info_cache) > _MAX_CACHED_INFO:
+            _info_cache.popitem(last=False)
+    return info
+
+
+def get_audio_info(path):
+    """Duration, sample rate and chunk offsets for a file, probed at most once per version"""
+    key = _cache_key(path)
+    with _info_lock:
+        info = _info_cache.get(key)
+        if info is not None:
+            _info_cache.move_to_end(key)
+            return info
+
+    try:
+        duration, sample_rate = read_mp3_info(path)
+    except ValueError:
+        duration, sample_rate = _ffprobe_info(path)
+    return register_audio_info(path, AudioInfo(duration, sample_rate))
+
+
+def _ffprobe_info(path):
+    """Read duration and sample rate from the container header with ffprobe"""
+    cmd = [
+        "ffprobe", "-v", "error",
+        "-show_entries", "format=duration:stream=sample_rate",
+        "-of", "json", path,
+    ]
+    try:
+        result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+        probe = json.loads(result.stdout)
+        duration = float(probe["format"]["duration"])
+    except (OSError, ValueError, KeyError) as e:
+        raise Exception(f"Could not determine audio duration: {str(e)}")
+    sample_rate = None
+    for stream in probe.get("streams", []):
+        if stream.get("sample_rate"):
+            sample_rate = int(stream["sample_rate"])
+            break
+    return duration, sample_rate
+
+
+def _parse_header(header):
+    """Return (frame_length, samples, sample_rate) for a Layer III frame header, or None"""
+    if len(header) < 4 or header[0] != 0xFF or (header[1] & 0xE0) != 0xE0:
+        return None
+    version = (header[1] >> 3) & 3
+    layer = (header[1] >> 1) & 3
+    bitrate_index = header[2] >> 4
+    rate_index = (header[2] >> 2) & 3
+    padding = (header[2] >> 1) & 1
+    if version == 1 or layer != 1 or bitrate_index in (0, 15) or rate_index == 3:
+        return None
+
+    mpeg1 = version == 3
+    bitrate = _BITRATES[1 if mpeg1 else 2][bitrate_index]
+    sample_rate = _SAMPLE_RATES[version][rate_index]
+    if mpeg1:
+        return 144000 * bitrate // sample_rate + padding, 1152, sample_rate
+    return 72000 * bitrate // sample_rate + padding, 576, sample_rate
+
+
+def iter_mp3_frames(f):
+    """Yield (frame_bytes, samples, sample_rate) for every audio frame, skipping tags"""
+    first = True
+    while True:
+        header = f.read(10)
+        if len(header) < 4:
+            return
+
+        if header[:3] == b"ID3" and len(header) == 10:
+            # ID3v2 tag: syncsafe size, optional 10-byte footer
+            size = (header[6] << 21) | (header[7] << 14) | (header[8] << 7) | header[9]
+            f.seek(size + (10 if header[5] & 0x10 else 0), os.SEEK_CUR)
+            continue
+        if header[:3] == b"TAG":
+            # ID3v1 tag marks the end of the audio
+            return
+
+        info = _parse_header(header)
+        if info is None:
+            # Lost sync: step forward one byte and look again
+            f.seek(1 - len(header), os.SEEK_CUR)
+            continue
+
+        length, samples, sample_rate = info
+        body = f.read(length - len(header)) if length > len(header) else b""
+        frame = (header + body)[:length]
+        if len(frame) < length:
+            return
+        if length < len(header):
+            f.seek(length - len(header), os.SEEK_CUR)
+
+        # A leading Xing/Info frame only carries encoder metadata, not audio
+        if first and (b"Xing" in frame[:64] or b"Info" in frame[:64]):
+            first = False
+            continue
+        first = False
+        yield frame, samples, sample_rate
+
+
+def read_mp3_info(path):
+    """Duration and sample rate from the frame headers, without decoding any audio"""
+    total_samples = 0
+    sample_rate = None
+    duration = 0.0
+    with open(path, 'rb') as f:
+        for _, samples, rate in iter_mp3_frames(f):
+            sample_rate = sample_rate or rate
+            duration += samples / rate
+            total_samples += samples
+    if not total_samples:
+        raise ValueError(f"No MPEG audio frames found in {path}")
+    return duration, sample_rate
+
+
+def concat_mp3(parts, output_path):
+    """Join MP3 files frame by frame without decoding or re-encoding
+
+    Returns the output's AudioInfo, whose chunk offsets hold the start of every part
+    plus the total duration in seconds.
+    """
+    try:
+        offsets = [0.0]
+        sample_rate = None
+        with open(output_path, 'wb') as out:
+            for part in parts:
+                duration = 0.0
+                with open(part, 'rb') as f:
+                    for frame, samples, rate in iter_mp3_frames(f):
+                        out.write(frame)
+                        duration += samples / rate
+                        sample_rate = sample_rate or rate
+                if not duration:
+                    raise ValueError(f"No MPEG audio frames found in {part}")
+                offsets.append(offsets[-1] + duration)
+        return register_audio_info(output_path, AudioInfo(offsets[-1], sample_rate, offsets))
+    except ValueError as e:
+        logging.warning(f"Frame-level MP3 concatenation failed, using ffmpeg concat: {str(e)}")
+        _ffmpeg_concat(parts, output_path)
+        return get_audio_info(output_path)
+
+
+def _ffmpeg_concat(parts, output_path):
+    """Stream-copy concatenation through ffmpeg's concat demuxer"""
+    list_file = tempfile.NamedTemporaryFile('w', suffix='.txt', delete=False)
+    try:
+        with list_file:
+            for path in parts:
+                escaped = os.path.abspath(path).replace("'", "'\\''")
+                list_file.write(f"file '{escaped}'\n")
+        cmd = [
+            "ffmpeg", "-y", "-v", "error",
+            "-f", "concat", "-safe", "0", "-i", list_file.name,
+            "-c", "copy", output_path,
+        ]
+        result = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+        if result.returncode != 0 or not os.path.exists(output_path):
+            raise Exception(f"Failed to concatenate audio: {result.stderr.strip()}")
+    finally:
+        os.remove(list_file.name)
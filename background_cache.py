@@ -0,0 +1,192 @@
+import cv2
+import numpy as np
+import os
+import json
+import logging
+import shutil
+import subprocess
+import tempfile
+from disk_cache import file_digest
+
+
+class BackgroundCache:
+    """Keeps background clips pre-converted to the exact output size and frame rate"""
+
+    def __init__(self, cache_dir, width, height, fps):
+        self.cache_dir = cache_dir
+        self.width = width
+        self.height = height
+        self.fps = fps
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def available(self):
+        """The cache needs ffmpeg both to build clips and to stream frames back"""
+        return shutil.which("ffmpeg") is not None
+
+    def open(self, source_path, start_frame=0):
+        """Open a looping, sequential frame reader over the prepared clip"""
+        prepared_path, meta = self.prepare(source_path)
+        return BackgroundReader(prepared_path, self.width, self.height, self.fps, meta["frame_count"], start_frame)
+
+    def prepare(self, source_path):
+        """Return the prepared clip for a source, rebuilding it if the source changed"""
+        name = os.path.splitext(os.path.basename(source_path))[0]
+        stem = f"{name}_{self.width}x{self.height}_{self.fps}fps"
+        prepared_path = os.path.join(self.cache_dir, f"{stem}.mp4")
+        meta_path = os.path.join(self.cache_dir, f"{stem}.json")
+
+        stat = os.stat(source_path)
+        meta = self._load_meta(meta_path)
+
+        if meta and os.path.exists(prepared_path):
+            if meta["mtime"] == stat.st_mtime and meta["size"] == stat.st_size:
+                return prepared_path, meta
+
+            # Touched but possibly unchanged (copied, re-synced): compare content
+            digest = file_digest(source_path)
+            if meta["sha256"] == digest:
+                meta.update(mtime=stat.st_mtime, size=stat.st_size)
+                self._save_meta(meta_path, meta)
+                return prepared_path, meta
+        else:
+            digest = file_digest(source_path)
+
+        logging.info(f"Preparing background clip cache for {source_path}")
+        frame_count = self._convert(source_path, prepared_path)
+        meta = {
+            "source": os.path.abspath(source_path),
+            "mtime": stat.st_mtime,
+            "size": stat.st_size,
+            "sha256": digest,
+            "width": self.width,
+            "height": self.height,
+            "fps": self.fps,
+            "frame_count": frame_count,
+        }
+        self._save_meta(meta_path, meta)
+        return prepared_path, meta
+
+    def _convert(self, source_path, prepared_path):
+        """Scale to cover, center-crop and resample the clip once with ffmpeg"""
+        # Unique build name so concurrent jobs never write the same partial file
+        fd, temp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.mp4')
+        os.close(fd)
+        video_filter = (
+            f"scale={self.width}:{self.height}:force_original_aspect_ratio=increase:flags=bilinear,"
+            f"crop={self.width}:{self.height},"
+            f"setpts=PTS-STARTPTS,fps={self.fps}"
+        )
+        cmd = [
+            "ffmpeg", "-y", "-v", "error", "-nostats", "-progress", "pipe:1",
+            "-i", source_path,
+            "-an", "-vf", video_filter,
+            "-c:v", "libx264", "-preset", "veryfast", "-crf", "12",
+            "-g", str(self.fps), "-pix_fmt", "yuv420p",
+            temp_path,
+        ]
+        try:
+            result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+            if result.returncode != 0:
+                raise Exception(f"Failed to prepare background clip: {result.stderr.strip()}")
+
+            frame_count = 0
+            for line in result.stdout.splitlines():
+                if line.startswith("frame="):
+                    frame_count = int(line.split("=", 1)[1])
+            if frame_count <= 0:
+                raise Exception("Prepared background clip has no frames")
+
+            os.replace(temp_path, prepared_path)
+            return frame_count
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    def _load_meta(self, meta_path):
+        try:
+            with open(meta_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _save_meta(self, meta_path, meta):
+        fd, temp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.json')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(meta, f)
+        os.replace(temp_path, meta_path)
+
+
+class BackgroundReader:
+    """Streams raw BGR frames from a prepared clip, looping at the end"""
+
+    def __init__(self, path, width, height, fps, frame_count, start_frame=0):
+        self.path = path
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.frame_count = frame_count
+        self.frame_size = width * height * 3
+        self.process = None
+        self._start(start_frame % frame_count)
+
+    def _start(self, start_frame):
+        cmd = ["ffmpeg", "-v", "error"]
+        if start_frame:
+            # Half a frame early so the accurate seek keeps the requested frame
+            cmd += ["-ss", f"{(start_frame - 0.5) / self.fps:.6f}"]
+        cmd += ["-i", self.path, "-f", "rawvideo", "-pix_fmt", "bgr24", "pipe:1"]
+        self.process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, bufsize=self.frame_size)
+
+    def _read_into(self, buffer):
+        view = memoryview(buffer)
+        filled = 0
+        while filled < self.frame_size:
+            n = self.process.stdout.readinto(view[filled:])
+            if not n:
+                break
+            filled += n
+        return filled
+
+    def read(self):
+        """Return the next frame as a writable array backed by its read buffer"""
+        buffer = bytearray(self.frame_size)
+        if self._read_into(buffer) < self.frame_size:
+            # End of clip: loop back to the first frame
+            self._stop()
+            self._start(0)
+            if self._read_into(buffer) < self.frame_size:
+                raise Exception("Could not read frame from background clip")
+        return np.frombuffer(buffer, dtype=np.uint8).reshape(self.height, self.width, 3)
+
+    def _stop(self):
+        if self.process:
+            self.process.stdout.close()
+            self.process.kill()
+            self.process.wait()
+            self.process = None
+
+    def release(self):
+        self._stop()
+
+
+class CaptureReader:
+    """Fallback reader that decodes and resizes the source clip frame by frame"""
+
+    def __init__(self, path, process_frame, start_frame=0):
+        self.cap = cv2.VideoCapture(path)
+        if not self.cap.isOpened():
+            raise Exception("Error: Could not open background video")
+        self.process_frame = process_frame
+        if start_frame:
+            frame_count = int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT)) or 1
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame % frame_count)
+
+    def read(self):
+        ret, frame = self.cap.read()
+        if not ret:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ret, frame = self.cap.read()
+        return self.process_frame(frame)
+
+    def release(self):
+        self.cap.release()
@@ -0,0 +1,104 @@
+"""Measure streamlit_app cold start: import time, heavy modules loaded, first render and rerun cost.
+
+    python benchmarks/bench_cold_start.py
+    git worktree add /tmp/genzify-old <rev> && python benchmarks/bench_cold_start.py --repo /tmp/genzify-old
+"""
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ["cv2", "PIL", "numpy", "pydub", "gtts", "supabase", "groq", "httpx", "PyPDF2"]
+
+IMPORT_PROBE = """
+import sys, time, json
+sys.path.insert(0, {repo!r})
+start = time.perf_counter()
+import streamlit
+base = time.perf_counter()
+import streamlit_app
+end = time.perf_counter()
+print(json.dumps({{
+    "streamlit_s": base - start,
+    "app_s": end - base,
+    "modules": [m for m in {heavy!r} if m in sys.modules],
+}}))
+"""
+
+RENDER_PROBE = """
+import sys, time, json
+sys.path.insert(0, {repo!r})
+from streamlit.testing.v1 import AppTest
+app = AppTest.from_file({script!r}, default_timeout=120)
+start = time.perf_counter()
+app.run()
+first = time.perf_counter() - start
+def median_rerun():
+    times = []
+    for _ in range({reruns}):
+        start = time.perf_counter()
+        app.run()
+        times.append(time.perf_counter() - start)
+    return sorted(times)[len(times) // 2]
+rerun = median_rerun()
+# With notes loaded every rerun reaches the Q&A and video widgets and the services behind them
+app.session_state["text_content"] = "Photosynthesis turns light into chemical energy. " * 200
+loaded_rerun = median_rerun()
+print(json.dumps({{
+    "first_s": first, "rerun_s": rerun, "loaded_rerun_s": loaded_rerun,
+    "errors": [e.message for e in app.exception],
+}}))
+"""
+
+
+def run_probe(code, repo):
+    env = dict(os.environ)
+    # Placeholder credentials: services are built but never reach the network here
+    env.setdefault("GROQ_API_KEY", "bench")
+    env.setdefault("SUPABASE_URL", "https://example.invalid")
+    env.setdefault("SUPABASE_KEY", "bench.bench.bench")  # Supabase only checks the key is JWT-shaped
+    result = subprocess.run(
+        [sys.executable, "-c", code], cwd=repo, env=env,
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "probe failed")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repo", default=REPO_DIR, help="checkout to measure (e.g. a worktree of an older commit)")
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters per measurement")
+    parser.add_argument("--reruns", type=int, default=5, help="reruns per AppTest session")
+    args = parser.parse_args()
+
+    repo = os.path.abspath(args.repo)
+    script = os.path.join(repo, "streamlit_app.py")
+
+    imports = [run_probe(IMPORT_PROBE.format(repo=repo, heavy=HEAVY_MODULES), repo) for _ in range(args.runs)]
+    print(f"repo: {repo}")
+    print(f"import streamlit      {statistics.median(i['streamlit_s'] for i in imports) * 1000:8.1f} ms")
+    print(f"import streamlit_app  {statistics.median(i['app_s'] for i in imports) * 1000:8.1f} ms")
+    print(f"heavy modules loaded  {', '.join(imports[0]['modules']) or 'none'}")
+
+    try:
+        renders = [
+            run_probe(RENDER_PROBE.format(repo=repo, script=script, reruns=args.reruns), repo)
+            for _ in range(args.runs)
+        ]
+    except RuntimeError as e:
+        print(f"render measurement unavailable: {e}")
+        return
+    print(f"first render          {statistics.median(r['first_s'] for r in renders) * 1000:8.1f} ms")
+    print(f"rerun                 {statistics.median(r['rerun_s'] for r in renders) * 1000:8.1f} ms")
+    print(f"rerun with notes      {statistics.median(r['loaded_rerun_s'] for r in renders) * 1000:8.1f} ms")
+    for error in renders[0]["errors"]:
+        print(f"warning: the app raised during rendering: {error}")
+
+
+if __name__ == "__main__":
+    main()
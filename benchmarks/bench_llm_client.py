@@ -0,0 +1,79 @@
+"""Drive the shared LLM client against the local stub server under rate limiting and errors.
+
+    python benchmarks/bench_llm_client.py --requests 40 --concurrency 16 --rate-limit-every 5
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from llm_client import LLMClient
+from stub_groq_server import StubGroqServer
+
+
+def run_sync(client, n_requests, concurrency):
+    def one(i):
+        response = client.create(model="stub", messages=[{"role": "user", "content": f"question {i}"}], timeout=60)
+        return response.choices[0].message.content
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        return list(pool.map(one, range(n_requests)))
+
+
+async def run_async(client, n_requests):
+    return await asyncio.gather(*[
+        client.acreate(model="stub", messages=[{"role": "user", "content": f"question {i}"}], timeout=60)
+        for i in range(n_requests)
+    ])
+
+
+def run_stream(client):
+    return "".join(
+        chunk.choices[0].delta.content or ""
+        for chunk in client.stream(model="stub", messages=[{"role": "user", "content": "stream"}], timeout=60)
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=40)
+    parser.add_argument("--concurrency", type=int, default=16, help="caller threads")
+    parser.add_argument("--limit", type=int, default=4, help="client-side concurrency limit")
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--rate-limit-every", type=int, default=5)
+    parser.add_argument("--error-every", type=int, default=7)
+    parser.add_argument("--retry-after", type=float, default=0.2)
+    args = parser.parse_args()
+
+    with StubGroqServer(
+        latency=args.latency, rate_limit_every=args.rate_limit_every,
+        error_every=args.error_every, retry_after=args.retry_after
+    ) as server:
+        client = LLMClient(api_key="stub", base_url=server.base_url, max_concurrency=args.limit,
+                           max_retries=8, base_delay=0.05)
+
+        start = time.perf_counter()
+        run_sync(client, args.requests, args.concurrency)
+        sync_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        asyncio.run(run_async(client, args.requests))
+        async_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        run_stream(client)
+        stream_s = time.perf_counter() - start
+
+        print(f"sync   {args.requests} requests in {sync_s:.2f}s")
+        print(f"async  {args.requests} requests in {async_s:.2f}s")
+        print(f"stream 1 request in {stream_s:.2f}s")
+        print(f"server saw {server.requests} requests, {server.rate_limited} rate limited")
+        print(f"client stats {client.stats()}")
+
+
+if __name__ == "__main__":
+    main()
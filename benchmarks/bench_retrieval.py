@@ -0,0 +1,63 @@
+"""Compare prompt size and latency of retrieved context against sending the full document.
+
+    python benchmarks/bench_retrieval.py --words 20000 50000 200000
+    python benchmarks/bench_retrieval.py --live   # also time real Groq calls (needs GROQ_API_KEY)
+"""
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from retrieval import RetrievalIndex, estimate_tokens
+from fixtures import TOPICS, make_text as make_document
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--words", type=int, nargs="+", default=[5000, 50000, 200000])
+    parser.add_argument("--budget", type=int, default=3000, help="context token budget")
+    parser.add_argument("--live", action="store_true", help="time end-to-end answers against Groq")
+    args = parser.parse_args()
+
+    questions = [f"How does {topic} work?" for topic in TOPICS[:4]]
+
+    if args.live:
+        from llm_handler import LLMHandler
+        handler = LLMHandler()
+
+    print(f"{'words':>8} {'full_tokens':>12} {'ctx_tokens':>10} {'build_ms':>9} {'query_ms':>9} {'full_s':>7} {'ctx_s':>7}")
+    for n_words in args.words:
+        document = make_document(n_words)
+
+        start = time.perf_counter()
+        index = RetrievalIndex(document)
+        build_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        contexts = [index.build_context(q, args.budget) for q in questions]
+        query_ms = (time.perf_counter() - start) * 1000 / len(questions)
+
+        full_tokens = estimate_tokens(document)
+        ctx_tokens = sum(estimate_tokens(c) for c in contexts) // len(contexts)
+
+        full_s = ctx_s = float("nan")
+        if args.live:
+            handler.context_token_budget = 10 ** 9
+            start = time.perf_counter()
+            try:
+                handler.generate_answer(questions[0], document)
+                full_s = time.perf_counter() - start
+            except Exception as e:
+                print(f"  full-context request failed: {e}")
+            handler.context_token_budget = args.budget
+            start = time.perf_counter()
+            handler.generate_answer(questions[0], document)
+            ctx_s = time.perf_counter() - start
+
+        print(f"{n_words:>8} {full_tokens:>12} {ctx_tokens:>10} {build_ms:>9.1f} {query_ms:>9.2f} {full_s:>7.2f} {ctx_s:>7.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""Synthetic, deterministic inputs for the benchmarks: PDFs, a background clip and speech audio."""
+import os
+import time
+import random
+import subprocess
+
+TOPICS = ["photosynthesis", "mitochondria", "enzymes", "osmosis", "ribosomes", "chlorophyll", "glycolysis", "membranes"]
+FILLER = "the of and a to in is that it for on as with was by this are be from at an which".split()
+
+# One silent MPEG-1 Layer III frame: 32 kbps, 44.1 kHz, mono. All-zero side info decodes as silence.
+_MP3_HEADER = bytes([0xFF, 0xFB, 0x10, 0xC0])
+_MP3_FRAME = _MP3_HEADER + bytes(144000 * 32 // 44100 - len(_MP3_HEADER))
+MP3_FRAME_SECONDS = 1152 / 44100
+WORDS_PER_SECOND = 2.5  # Roughly gTTS speaking rate
+
+
+def make_text(n_words, seed=0):
+    """Lecture-like filler text with topic terms and sentence breaks"""
+    rng = random.Random(seed)
+    words = []
+    for i in range(n_words):
+        words.append(rng.choice(TOPICS) if rng.random() < 0.03 else rng.choice(FILLER))
+        if i % 15 == 14:
+            words[-1] += "."
+    return " ".join(words)
+
+
+def make_pdf(path, pages, words_per_page=400, seed=0):
+    """Write a text PDF with the given number of pages using only the standard Helvetica font"""
+    words = make_text(pages * words_per_page, seed).split()
+    page_lines = []
+    for page in range(pages):
+        page_words = words[page * words_per_page:(page + 1) * words_per_page]
+        page_lines.append([" ".join(page_words[i:i + 12]) for i in range(0, len(page_words), 12)])
+
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        f"<< /Type /Pages /Kids [{' '.join(f'{4 + 2 * i} 0 R' for i in range(pages))}] /Count {pages} >>".encode(),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    for i, lines in enumerate(page_lines):
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {5 + 2 * i} 0 R >>".encode()
+        )
+        escaped = (line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)") for line in lines)
+        body = ("BT /F1 10 Tf 50 750 Td 12 TL " + " ".join(f"({line}) '" for line in escaped) + " ET").encode("latin-1")
+        objects.append(b"<< /Length %d >>\nstream\n" % len(body) + body + b"\nendstream")
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, obj in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + obj + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+
+    with open(path, "wb") as f:
+        f.write(out)
+    return path
+
+
+class UploadedFile:
+    """Stands in for Streamlit's UploadedFile"""
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self._data = f.read()
+        self.name = os.path.basename(path)
+        self.size = len(self._data)
+        self.file_id = None  # No upload id: every call hashes the bytes like a fresh upload
+
+    def getvalue(self):
+        return self._data
+
+
+def make_speech(path, seconds):
+    """Write a silent MP3 of the given length, frame-exact and without an encoder"""
+    frames = max(1, round(seconds / MP3_FRAME_SECONDS))
+    with open(path, "wb") as f:
+        f.write(_MP3_FRAME * frames)
+    return path
+
+
+class StubSynthesizer:
+    """Deterministic gTTS stand-in: silent audio as long as the text would take to speak"""
+    name = "stub"
+
+    def __init__(self, latency=0.0, seconds_per_char=0.0):
+        self.latency = latency  # Fixed delay per request, like gTTS's round trip
+        self.seconds_per_char = seconds_per_char
+
+    def synthesize(self, text, lang, slow, output_path):
+        time.sleep(self.latency + self.seconds_per_char * len(text))
+        make_speech(output_path, len(text.split()) / WORDS_PER_SECOND)
+
+
+def make_background_clip(path, seconds=10, width=1280, height=720, fps=30):
+    """Encode a moving test pattern as the background video"""
+    cmd = [
+        "ffmpeg", "-y", "-v", "error",
+        "-f", "lavfi", "-i", f"testsrc2=size={width}x{height}:rate={fps}:duration={seconds}",
+        "-c:v", "libx264", "-preset", "ultrafast", "-pix_fmt", "yuv420p",
+        path,
+    ]
+    subprocess.run(cmd, check=True)
+    return path
@@ -0,0 +1,510 @@
+"""Offline benchmark suite for the PDF -> summary -> speech -> video pipeline.
+
+Every input is synthetic and every network service is a local stub, so runs are repeatable
+without API keys. Each case runs in a fresh process so its peak memory is its own.
+
+    python benchmarks/run_benchmarks.py --quick
+    python benchmarks/run_benchmarks.py --output results.json --save-baseline benchmarks/baseline.json
+    python benchmarks/run_benchmarks.py --baseline benchmarks/baseline.json --threshold 0.15
+
+Metric names carry their direction: *_s and *_mb are better lower, *_per_s and *_fps better
+higher. With --baseline the run exits non-zero when any of them regresses past the threshold.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import random
+import tempfile
+import platform
+import argparse
+import statistics
+import subprocess
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+sys.path[:0] = [REPO_DIR, BENCH_DIR]
+
+from fixtures import (
+    UploadedFile, StubSynthesizer, WORDS_PER_SECOND,
+    make_text, make_pdf, make_speech, make_background_clip,
+)
+
+PROFILES = {
+    "quick": {
+        "pdf_pages": [10, 50],
+        "summary_words": [2000, 30000],
+        "tts_words": [150],
+        "video_seconds": [5],
+        "rate_control": {"seconds": 5, "budget_mb": 0.5},
+        "pipeline_words": [40],
+        "upload_mb": [8],
+    },
+    "full": {
+        "pdf_pages": [20, 100, 400],
+        "summary_words": [5000, 50000],
+        "tts_words": [150, 400],
+        "video_seconds": [10, 30, 60],
+        "rate_control": {"seconds": 30, "budget_mb": 3},
+        "pipeline_words": [150, 300],
+        "upload_mb": [8, 45],
+    },
+}
+
+
+class NullSink:
+    """Encoder stand-in that discards frames, to time rendering alone"""
+
+    def write(self, frame):
+        pass
+
+    def close(self):
+        pass
+
+    def abort(self):
+        pass
+
+
+def _no_progress(progress, message):
+    pass
+
+
+def _video_generator(env, profile="full"):
+    from video_generator import VideoGenerator
+    generator = VideoGenerator(profile)
+    generator.background_video = env["background_clip"]
+    generator.background_cache_dir = env["background_cache"]
+    generator.output_dir = env["scratch"]
+    generator.video_cache = None  # Render every time: measure the work, not the cache
+    generator._build_components()
+    return generator
+
+
+def _llm_handler(env):
+    from llm_handler import LLMHandler
+    from disk_cache import DiskCache
+    from response_cache import ResponseCache
+    handler = LLMHandler()
+    handler.response_cache = ResponseCache(":memory:")  # Cold caches: measure the work, not the cache
+    handler.summary_cache = DiskCache(tempfile.mkdtemp(dir=env["scratch"]), 50 * 1024 * 1024)
+    return handler
+
+
+def _tts_handler(env, synthesizer):
+    from tts_handler import TTSHandler
+    from disk_cache import DiskCache
+    handler = TTSHandler(synthesizer=synthesizer)
+    handler.cache = DiskCache(tempfile.mkdtemp(dir=env["scratch"]), 200 * 1024 * 1024)
+    return handler
+
+
+def case_pdf_extract(env, pages):
+    from pdf_processor import PDFProcessor, ExtractionCache
+    processor = PDFProcessor(cache=ExtractionCache(tempfile.mkdtemp(dir=env["scratch"])))
+    upload = UploadedFile(env["pdfs"][str(pages)])
+
+    start = time.perf_counter()
+    text = processor.extract_text(upload)
+    cold = time.perf_counter() - start
+
+    start = time.perf_counter()
+    processor.extract_text(upload)
+    cached = time.perf_counter() - start
+    return {"wall_s": cold, "pages_per_s": pages / cold, "cached_s": cached, "chars": len(text)}
+
+
+def case_summary(env, words):
+    from stub_groq_server import StubGroqServer
+    with StubGroqServer(reply=make_text(150, seed=1), latency=0.05) as server:
+        os.environ["GROQ_BASE_URL"] = server.base_url
+        handler = _llm_handler(env)
+        start = time.perf_counter()
+        handler.generate_summary(make_text(words))
+        wall = time.perf_counter() - start
+        return {"wall_s": wall, "llm_requests": server.requests}
+
+
+def case_tts(env, words):
+    from job_workspace import JobWorkspace
+    from audio_utils import get_audio_info
+    handler = _tts_handler(env, StubSynthesizer(latency=0.2, seconds_per_char=0.001))
+    with JobWorkspace(temp_root=env["scratch"]) as workspace:
+        start = time.perf_counter()
+        audio_file = handler.generate_speech(make_text(words), progress_callback=_no_progress, workspace=workspace)
+        wall = time.perf_counter() - start
+        return {"wall_s": wall, "audio_seconds": get_audio_info(audio_file).duration}
+
+
+def case_background_prepare(env):
+    from background_cache import BackgroundCache
+    cache = BackgroundCache(tempfile.mkdtemp(dir=env["scratch"]), 1080, 1920, 30)
+    start = time.perf_counter()
+    cache.prepare(env["background_clip"])
+    return {"wall_s": time.perf_counter() - start}
+
+
+def case_render(env, seconds):
+    generator = _video_generator(env)
+    words = make_text(int(seconds * WORDS_PER_SECOND)).split()
+    frames = seconds * generator.fps
+    start = time.perf_counter()
+    generator._render_frames(words, frames / len(words), 0, frames, NullSink())
+    wall = time.perf_counter() - start
+    return {"wall_s": wall, "render_fps": frames / wall, "frames": frames}
+
+
+def case_encode(env, seconds):
+    from video_encoder import FFmpegPipeEncoder
+    generator = _video_generator(env)
+    background = generator._open_background(0)
+    try:
+        frames = [background.read() for _ in range(generator.fps)]
+    finally:
+        background.release()
+
+    output = os.path.join(env["scratch"], f"encode_{seconds}.mp4")
+    total = seconds * generator.fps
+    start = time.perf_counter()
+    encoder = FFmpegPipeEncoder(output, generator.width, generator.height, generator.fps)
+    for i in range(total):
+        encoder.write(frames[i % len(frames)])
+    encoder.close()
+    wall = time.perf_counter() - start
+    return {"wall_s": wall, "encode_fps": total / wall, "output_mb": os.path.getsize(output) / 1e6}
+
+
+def case_create_video(env, seconds, engine, profile="full"):
+    from job_workspace import JobWorkspace
+    generator = _video_generator(env, profile)
+    generator.render_engine = engine
+    audio_file = make_speech(os.path.join(env["scratch"], f"speech_{seconds}.mp3"), seconds)
+    with JobWorkspace(temp_root=env["scratch"]) as workspace:
+        start = time.perf_counter()
+        output = generator.create_video(
+            make_text(int(seconds * WORDS_PER_SECOND)), audio_file,
+            workspace=workspace, progress_callback=_no_progress
+        )
+        wall = time.perf_counter() - start
+    return {
+        "wall_s": wall,
+        "video_fps": seconds * generator.fps / wall,
+        "output_mb": os.path.getsize(output) / 1e6,
+    }
+
+
+def case_rate_control(env, seconds, budget_mb, mode, speed):
+    from job_workspace import JobWorkspace
+    from video_encoder import RateControl
+    generator = _video_generator(env)
+    generator.rate_control = RateControl(mode=mode, speed=speed)
+    generator.max_file_size = budget_mb * 1e6  # Small enough that the test clip has to be squeezed
+    audio_file = make_speech(os.path.join(env["scratch"], f"speech_{seconds}.mp3"), seconds)
+    with JobWorkspace(temp_root=env["scratch"]) as workspace:
+        start = time.perf_counter()
+        output = generator.create_video(
+            make_text(int(seconds * WORDS_PER_SECOND)), audio_file,
+            workspace=workspace, progress_callback=_no_progress
+        )
+        wall = time.perf_counter() - start
+    size = os.path.getsize(output)
+    return {"wall_s": wall, "output_mb": size / 1e6, "budget_ratio": size / generator.max_file_size}
+
+
+def case_pipeline(env, words, mode, profile="full"):
+    from stub_groq_server import StubGroqServer
+    from job_workspace import JobWorkspace
+    from pipeline import VideoPipeline, StreamingVideoPipeline
+    from telemetry import get_telemetry, get_progress_bus
+    from video_cache import VideoCache
+    # Token pacing and synthesis latency in the range of the real services
+    with StubGroqServer(reply=make_text(words, seed=2), latency=0.3, token_delay=0.02) as server:
+        os.environ["GROQ_BASE_URL"] = server.base_url
+        pipeline_class = StreamingVideoPipeline if mode == "streaming" else VideoPipeline
+        pipeline = pipeline_class(
+            _llm_handler(env),
+            _tts_handler(env, StubSynthesizer(latency=0.5, seconds_per_char=0.005)),
+            _video_generator(env, profile)
+        )
+        # Empty to start with, so the first run renders and the repeat below finds its video
+        pipeline.video_generator.video_cache = VideoCache(tempfile.mkdtemp(dir=env["scratch"]), 500 * 1024 * 1024)
+        bus = get_progress_bus()
+        events = []
+        bus.subscribe(events.append, job_id="bench")
+        with JobWorkspace(temp_root=env["scratch"]) as workspace:
+            start = time.perf_counter()
+            output = pipeline.run(make_text(2000), workspace, bus.reporter("bench"))["video_path"]
+            wall = time.perf_counter() - start
+
+            metrics = {"wall_s": wall, "output_mb": os.path.getsize(output) / 1e6, "progress_events": len(events)}
+            # Time inside each instrumented stage, summed over threads (stages overlap when streaming)
+            for histogram in get_telemetry().snapshot()["histograms"]:
+                if histogram["name"] == "span_seconds":
+                    key = f"{histogram['labels']['span']}_total_s"
+                    metrics[key] = metrics.get(key, 0) + histogram["sum"]
+
+            # The same request again, now that the summary, speech and video are all cached
+            start = time.perf_counter()
+            pipeline.run(make_text(2000), workspace, _no_progress)
+            metrics["repeat_s"] = time.perf_counter() - start
+    return metrics
+
+
+def case_upload(env, mb):
+    from stub_storage_server import StubStorageServer
+    from storage_manager import StorageManager, SupabaseBucket
+    path = os.path.join(env["scratch"], f"upload_{mb}.mp4")
+    with open(path, "wb") as f:
+        f.write(random.Random(mb).randbytes(int(mb * 1024 * 1024)))
+
+    with StubStorageServer() as server:
+        storage = StorageManager(bucket=SupabaseBucket(server.base_url, "stub", "videos"))
+        start = time.perf_counter()
+        storage.upload_video(path, keep_local=True)
+        wall = time.perf_counter() - start
+
+        start = time.perf_counter()
+        storage.upload_video(path, keep_local=True)  # Same content: found by hash, not re-sent
+        dedupe = time.perf_counter() - start
+    return {"wall_s": wall, "upload_mb_per_s": mb / wall, "dedupe_s": dedupe}
+
+
+def build_cases(profile):
+    """(case id, function name, kwargs, needs ffmpeg) for every case in the profile"""
+    cases = []
+    for pages in profile["pdf_pages"]:
+        cases.append((f"pdf_extract[pages={pages}]", "case_pdf_extract", {"pages": pages}, False))
+    for words in profile["summary_words"]:
+        cases.append((f"summary[words={words}]", "case_summary", {"words": words}, False))
+    for words in profile["tts_words"]:
+        cases.append((f"tts[words={words}]", "case_tts", {"words": words}, False))
+    cases.append(("background_prepare", "case_background_prepare", {}, True))
+    for seconds in profile["video_seconds"]:
+        cases.append((f"render[seconds={seconds}]", "case_render", {"seconds": seconds}, True))
+        cases.append((f"encode[seconds={seconds}]", "case_encode", {"seconds": seconds}, True))
+        for engine in ("frames", "subtitles"):
+            cases.append((
+                f"create_video[seconds={seconds},engine={engine}]", "case_create_video",
+                {"seconds": seconds, "engine": engine}, True
+            ))
+            cases.append((
+                f"create_video[seconds={seconds},engine={engine},profile=draft]", "case_create_video",
+                {"seconds": seconds, "engine": engine, "profile": "draft"}, True
+            ))
+    sweep = profile["rate_control"]
+    for mode, speed in [("crf", "balanced"), ("single_pass", "balanced"), ("single_pass", "fastest"), ("two_pass", "balanced")]:
+        cases.append((
+            f"rate_control[seconds={sweep['seconds']},mode={mode},speed={speed}]", "case_rate_control",
+            dict(sweep, mode=mode, speed=speed), True
+        ))
+    for words in profile["pipeline_words"]:
+        for mode in ("staged", "streaming"):
+            cases.append((f"pipeline[words={words},mode={mode}]", "case_pipeline", {"words": words, "mode": mode}, True))
+        cases.append((
+            f"pipeline[words={words},mode=streaming,profile=draft]", "case_pipeline",
+            {"words": words, "mode": "streaming", "profile": "draft"}, True
+        ))
+    for mb in profile["upload_mb"]:
+        cases.append((f"upload[mb={mb}]", "case_upload", {"mb": mb}, False))
+    return cases
+
+
+def _run_case(function_name, kwargs, env):
+    """Child process entry point: run one case and add its peak memory"""
+    import resource
+    import logging
+    logging.disable(logging.WARNING)
+    os.environ.setdefault("GROQ_API_KEY", "stub")
+    os.environ["GENZIFY_TEMP_ROOT"] = env["scratch"]
+    os.environ["GENZIFY_PIPELINE"] = "streaming"
+
+    metrics = globals()[function_name](env, **kwargs)
+    metrics["peak_rss_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    metrics["children_peak_rss_mb"] = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+    return metrics
+
+
+def run_case(function_name, kwargs, env):
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+        return pool.submit(_run_case, function_name, kwargs, env).result()
+
+
+def prepare_inputs(profile, workdir):
+    env = {
+        "scratch": os.path.join(workdir, "scratch"),
+        "background_cache": os.path.join(workdir, "background_cache"),
+        "pdfs": {},
+    }
+    os.makedirs(env["scratch"], exist_ok=True)
+    for pages in profile["pdf_pages"]:
+        env["pdfs"][str(pages)] = make_pdf(os.path.join(workdir, f"notes_{pages}.pdf"), pages)
+    if shutil.which("ffmpeg"):
+        env["background_clip"] = make_background_clip(os.path.join(workdir, "background.mp4"))
+        # Render cases share one prepared clip per profile; preparing it is measured as its own case
+        from background_cache import BackgroundCache
+        from video_generator import RENDER_PROFILES
+        for settings in RENDER_PROFILES.values():
+            BackgroundCache(
+                env["background_cache"], settings["width"], settings["height"], settings["fps"]
+            ).prepare(env["background_clip"])
+    return env
+
+
+def metric_direction(name):
+    """'higher' or 'lower' is better, or None for descriptive values"""
+    if name.endswith("_per_s") or name.endswith("_fps"):
+        return "higher"
+    if name.endswith("_s") or name.endswith("_mb"):
+        return "lower"
+    return None
+
+
+def compare(results, baseline, threshold, min_seconds=0.005, only=(), allow_missing=False):
+    """Rows of (case, metric, baseline, current, change, regressed) for comparable metrics
+
+    A case that now fails, or no longer reports a metric the baseline has, is a regression.
+    Timings within min_seconds of the baseline are noise however large the relative change.
+    Baseline cases this run skipped or no longer has get a "skipped" or "missing" row, a
+    regression unless allow_missing; only holds the --only prefixes, so unselected cases
+    are not counted as missing.
+    """
+    rows = []
+    for case, metrics in results.items():
+        base = baseline.get("results", {}).get(case)
+        if not base or "skipped" in metrics or "skipped" in base or "error" in base:
+            continue
+        if "error" in metrics:
+            rows.append((case, "error", None, None, None, True))
+            continue
+        for metric, before in base.items():
+            direction = metric_direction(metric)
+            if direction is None:
+                continue
+            value = metrics.get(metric)
+            if value is None:
+                rows.append((case, metric, before, None, None, True))
+                continue
+            if not before:
+                continue
+            change = (value - before) / before
+            regressed = change > threshold if direction == "lower" else change < -threshold
+            if direction == "lower" and metric.endswith("_s") and value - before < min_seconds:
+                regressed = False
+            rows.append((case, metric, before, value, change, regressed))
+
+    for case, base in baseline.get("results", {}).items():
+        if "skipped" in base or "error" in base:
+            continue
+        if only and not any(case.startswith(prefix) for prefix in only):
+            continue
+        if case not in results:
+            rows.append((case, "missing", None, None, None, not allow_missing))
+        elif "skipped" in results[case]:
+            rows.append((case, "skipped", None, None, None, not allow_missing))
+    return rows
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR,
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True
+        ).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--quick", action="store_true", help="small inputs for a fast check")
+    parser.add_argument("--only", nargs="+", default=[], help="run cases whose id starts with any of these")
+    parser.add_argument("--repeat", type=int, default=1, help="runs per case; the median of each metric is kept")
+    parser.add_argument("--output", default=os.path.join(BENCH_DIR, "results.json"))
+    parser.add_argument("--baseline", help="results file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="allowed relative regression (0.10 = 10%%)")
+    parser.add_argument("--min-seconds", type=float, default=0.005,
+                        help="ignore timing regressions smaller than this many seconds")
+    parser.add_argument("--allow-missing", action="store_true",
+                        help="don't fail when baseline cases were skipped or no longer exist")
+    parser.add_argument("--save-baseline", help="also write this run's results here")
+    args = parser.parse_args()
+
+    profile = PROFILES["quick" if args.quick else "full"]
+    cases = [
+        case for case in build_cases(profile)
+        if not args.only or any(case[0].startswith(prefix) for prefix in args.only)
+    ]
+
+    workdir = tempfile.mkdtemp(prefix="genzify_bench_")
+    try:
+        env = prepare_inputs(profile, workdir)
+        results = {}
+        for case_id, function_name, kwargs, needs_ffmpeg in cases:
+            if needs_ffmpeg and "background_clip" not in env:
+                results[case_id] = {"skipped": "ffmpeg not found"}
+                print(f"{case_id:<52} skipped (ffmpeg not found)")
+                continue
+            try:
+                runs = [run_case(function_name, kwargs, env) for _ in range(args.repeat)]
+            except Exception as e:
+                results[case_id] = {"error": str(e)}
+                print(f"{case_id:<52} failed: {e}")
+                continue
+            results[case_id] = {metric: statistics.median(run[metric] for run in runs) for metric in runs[0]}
+            summary = "  ".join(
+                f"{metric}={value:.3g}" for metric, value in results[case_id].items() if metric_direction(metric)
+            )
+            print(f"{case_id:<52} {summary}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "meta": {
+            "profile": "quick" if args.quick else "full",
+            "revision": git_revision(),
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "repeat": args.repeat,
+        },
+        "results": results,
+    }
+    for path in filter(None, [args.output, args.save_baseline]):
+        with open(path, "w") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+        print(f"Results written to {path}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        rows = compare(results, baseline, args.threshold, args.min_seconds, args.only, args.allow_missing)
+        print(f"\nAgainst {args.baseline} (revision {baseline.get('meta', {}).get('revision')}), threshold {args.threshold:.0%}:")
+        for case, metric, before, after, change, regressed in rows:
+            flag = "REGRESSION" if regressed else ""
+            if metric == "error":
+                print(f"  {case:<52} failed: {results[case]['error']} {flag}")
+            elif metric == "missing":
+                print(f"  {case:<52} in the baseline but not run {flag}")
+            elif metric == "skipped":
+                print(f"  {case:<52} skipped: {results[case]['skipped']} {flag}")
+            elif after is None:
+                print(f"  {case:<52} {metric:<20} {before:>10.3g} -> {'missing':>10} {'':>7} {flag}")
+            else:
+                print(f"  {case:<52} {metric:<20} {before:>10.3g} -> {after:>10.3g} {change:+7.1%} {flag}")
+        regressions = [row for row in rows if row[5]]
+        unmeasured = [row for row in regressions if row[1] in ("missing", "skipped")]
+        if unmeasured:
+            print(f"{len(unmeasured)} baseline case(s) were not measured (pass --allow-missing to accept)")
+        if len(regressions) > len(unmeasured):
+            print(f"{len(regressions) - len(unmeasured)} metric(s) regressed by more than {args.threshold:.0%}")
+        if regressions:
+            sys.exit(1)
+        print("No regressions")
+
+
+if __name__ == "__main__":
+    main()
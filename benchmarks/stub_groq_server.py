@@ -0,0 +1,167 @@
+"""Local stand-in for the Groq chat completions API that can simulate 429s and slow responses.
+
+    python benchmarks/stub_groq_server.py --port 8808 --rate-limit-every 3 --latency 0.5
+    GROQ_BASE_URL=http://127.0.0.1:8808 streamlit run streamlit_app.py
+"""
+import json
+import time
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubGroqServer:
+    """Threaded HTTP server answering /openai/v1/chat/completions with canned text"""
+
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0, rate_limit_every=0,
+                 retry_after=1.0, error_every=0, error_status=503, token_delay=0.0,
+                 reply="This is a stub answer from the local test server."):
+        self.latency = latency  # Seconds before each response starts
+        self.token_delay = token_delay  # Seconds between streamed words
+        self.rate_limit_every = rate_limit_every  # Every Nth request gets a 429 (0 = never)
+        self.retry_after = retry_after
+        self.error_every = error_every  # Every Nth request gets error_status (0 = never)
+        self.error_status = error_status
+        self.reply = reply
+        self.requests = 0
+        self.rate_limited = 0
+        self.in_flight = 0
+        self.max_in_flight = 0  # Most requests being answered at once
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    def _next_outcome(self):
+        with self._lock:
+            self.requests += 1
+            n = self.requests
+            if self.rate_limit_every and n % self.rate_limit_every == 0:
+                self.rate_limited += 1
+                return 429
+            if self.error_every and n % self.error_every == 0:
+                return self.error_status
+            return 200
+
+    def _track(self, delta):
+        with self._lock:
+            self.in_flight += delta
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+    def _handler_class(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                if not self.path.endswith("/chat/completions"):
+                    return self._json(404, {"error": {"message": "not found"}})
+                stub._track(1)
+                try:
+                    self._complete(body)
+                finally:
+                    stub._track(-1)
+
+            def _complete(self, body):
+                time.sleep(stub.latency)
+                status = stub._next_outcome()
+                if status == 429:
+                    return self._json(429, {"error": {"message": "Rate limit reached", "type": "requests"}}, {
+                        "retry-after": f"{stub.retry_after}",
+                        "x-ratelimit-remaining-requests": "0",
+                        "x-ratelimit-reset-requests": f"{stub.retry_after}s",
+                    })
+                if status != 200:
+                    return self._json(status, {"error": {"message": "Service unavailable" if status >= 500 else "Bad request"}})
+
+                if body.get("stream"):
+                    return self._stream(body)
+                time.sleep(stub.token_delay * len(stub.reply.split(" ")))  # Whole answer generated first
+                return self._json(200, {
+                    "id": "chatcmpl-stub", "object": "chat.completion", "created": int(time.time()),
+                    "model": body.get("model", "stub"),
+                    "choices": [{"index": 0, "finish_reason": "stop",
+                                 "message": {"role": "assistant", "content": stub.reply}}],
+                    "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+                })
+
+            def _json(self, status, payload, headers=None):
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _stream(self, body):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                for word in stub.reply.split(" "):
+                    chunk = {
+                        "id": "chatcmpl-stub", "object": "chat.completion.chunk", "created": int(time.time()),
+                        "model": body.get("model", "stub"),
+                        "choices": [{"index": 0, "finish_reason": None, "delta": {"content": word + " "}}],
+                    }
+                    self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+                    self.wfile.flush()
+                    time.sleep(stub.token_delay)
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.close_connection = True
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8808)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds before each response")
+    parser.add_argument("--rate-limit-every", type=int, default=0, help="answer every Nth request with a 429")
+    parser.add_argument("--error-every", type=int, default=0, help="answer every Nth request with an error")
+    parser.add_argument("--error-status", type=int, default=503, help="HTTP status of those errors")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="retry-after sent with each 429")
+    parser.add_argument("--token-delay", type=float, default=0.0, help="seconds between streamed words")
+    args = parser.parse_args()
+
+    server = StubGroqServer(
+        port=args.port, latency=args.latency, rate_limit_every=args.rate_limit_every,
+        retry_after=args.retry_after, error_every=args.error_every,
+        error_status=args.error_status, token_delay=args.token_delay
+    )
+    print(f"Stub Groq API listening on {server.base_url}")
+    try:
+        server._server.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""Local stand-in for the Supabase Storage API: object list/upload and resumable (TUS) uploads.
+
+    python benchmarks/stub_storage_server.py --port 8809 --fail-every 3
+    SUPABASE_URL=http://127.0.0.1:8809 SUPABASE_KEY=stub.stub.stub streamlit run streamlit_app.py
+"""
+import json
+import uuid
+import base64
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubStorageServer:
+    """Threaded HTTP server keeping uploaded objects in memory"""
+
+    def __init__(self, host="127.0.0.1", port=0, fail_every=0, truncate_failed_parts=True):
+        self.fail_every = fail_every  # Every Nth part upload fails with a 503 (0 = never)
+        self.truncate_failed_parts = truncate_failed_parts  # A failed part still stores half its bytes
+        self.objects = {}  # (bucket, name) -> bytes
+        self.uploads = {}  # upload id -> {"bucket", "name", "length", "data"}
+        self.requests = {"list": 0, "upload": 0, "create": 0, "patch": 0, "head": 0}
+        self.bytes_received = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    def _count(self, name, received=0):
+        with self._lock:
+            self.requests[name] += 1
+            self.bytes_received += received
+            return self.requests[name]
+
+    def _handler_class(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _body(self):
+                return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+            def _reply(self, status, payload=None, headers=None):
+                data = json.dumps(payload).encode("utf-8") if payload is not None else b""
+                self.send_response(status)
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                if payload is not None:
+                    self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_POST(self):
+                parts = self.path.split("?")[0].strip("/").split("/")
+                body = self._body()
+                if parts[:4] == ["storage", "v1", "object", "list"]:
+                    stub._count("list")
+                    search = json.loads(body or b"{}").get("search", "")
+                    names = [name for (bucket, name) in stub.objects if bucket == parts[4] and search in name]
+                    return self._reply(200, [{"name": name} for name in names])
+                if parts[:3] == ["storage", "v1", "object"]:
+                    stub._count("upload", len(body))
+                    stub.objects[(parts[3], "/".join(parts[4:]))] = body
+                    return self._reply(200, {"Key": "/".join(parts[3:])})
+                if parts == ["storage", "v1", "upload", "resumable"]:
+                    stub._count("create")
+                    metadata = dict(
+                        (field, base64.b64decode(value).decode("utf-8"))
+                        for field, value in (item.split(" ") for item in self.headers["Upload-Metadata"].split(","))
+                    )
+                    upload_id = uuid.uuid4().hex
+                    stub.uploads[upload_id] = {
+                        "bucket": metadata["bucketName"], "name": metadata["objectName"],
+                        "length": int(self.headers["Upload-Length"]), "data": bytearray(),
+                    }
+                    return self._reply(201, headers={"Location": f"/storage/v1/upload/resumable/{upload_id}"})
+                return self._reply(404, {"error": "not found"})
+
+            def do_HEAD(self):
+                stub._count("head")
+                upload = stub.uploads.get(self.path.rstrip("/").split("/")[-1])
+                if upload is None:
+                    return self._reply(404)
+                self._reply(200, headers={"Upload-Offset": str(len(upload["data"])), "Tus-Resumable": "1.0.0"})
+
+            def do_PATCH(self):
+                upload = stub.uploads.get(self.path.rstrip("/").split("/")[-1])
+                body = self._body()
+                n = stub._count("patch", len(body))
+                if upload is None:
+                    return self._reply(404, {"error": "unknown upload"})
+                offset = int(self.headers["Upload-Offset"])
+                if offset != len(upload["data"]):
+                    return self._reply(409, {"error": "offset mismatch"})
+                if stub.fail_every and n % stub.fail_every == 0:
+                    # Simulate a connection that died partway through the part
+                    if stub.truncate_failed_parts:
+                        upload["data"].extend(body[:len(body) // 2])
+                    return self._reply(503, {"error": "upstream connection reset"})
+                upload["data"].extend(body)
+                if len(upload["data"]) >= upload["length"]:
+                    stub.objects[(upload["bucket"], upload["name"])] = bytes(upload["data"])
+                self._reply(204, headers={"Upload-Offset": str(len(upload["data"])), "Tus-Resumable": "1.0.0"})
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8809)
+    parser.add_argument("--fail-every", type=int, default=0, help="fail every Nth part upload with a 503")
+    args = parser.parse_args()
+
+    server = StubStorageServer(port=args.port, fail_every=args.fail_every)
+    print(f"Stub storage API listening on {server.base_url}")
+    try:
+        server._server.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+import numpy as np
+from collections import OrderedDict
+from PIL import Image, ImageDraw, ImageFont
+
+
+class CaptionSprite:
+    """Pre-rasterized caption: one coverage mask per draw pass, in draw order"""
+
+    def __init__(self, x, y, masks, colors):
+        self.x = x
+        self.y = y
+        self.height, self.width = masks[0].shape
+
+        # Precompute both halves of the blend so a frame only needs a multiply-add per pass
+        self.layers = []
+        for mask, color in zip(masks, colors):
+            alpha = mask.astype(np.uint16)[:, :, None]
+            base = alpha * np.array(color, dtype=np.uint16) + 128
+            self.layers.append((255 - alpha, base))
+
+
+class CaptionRenderer:
+    def __init__(self, width, height, words_per_frame=2, font_path="arial.ttf",
+                 font_size=120, outline_width=4, max_cached=512):
+        self.width = width
+        self.height = height
+        self.words_per_frame = words_per_frame
+        self.outline_width = outline_width
+        self.max_cached = max_cached
+        self._sprites = OrderedDict()
+
+        # Load the font once instead of once per frame
+        try:
+            self.font = ImageFont.truetype(font_path, font_size)
+        except:
+            self.font = ImageFont.load_default()
+
+        # Outline passes first, main text last (BGR colors)
+        offsets = [-outline_width, outline_width]
+        self.passes = [((dx, dy), (0, 0, 0)) for dx in offsets for dy in offsets]
+        self.passes.append(((0, 0), (255, 255, 255)))
+
+    def resolve_text(self, text):
+        """Pick the words that will actually be drawn for a caption"""
+        words = text.split()
+        display_words = []
+
+        # Process words based on length
+        for word in words[:self.words_per_frame]:
+            if len(word) > 10:
+                # If we already have words to display, show those
+                if display_words:
+                    text = ' '.join(display_words)
+                else:
+                    # Show long word alone
+                    text = word
+                break
+            display_words.append(word)
+
+        if not display_words and not text:
+            text = ' '.join(words[:self.words_per_frame])
+
+        return text
+
+    def get_sprite(self, text):
+        """Return the cached sprite for a caption, rasterizing it on first use"""
+        sprite = self._sprites.get(text)
+        if sprite is not None:
+            self._sprites.move_to_end(text)
+            return sprite
+
+        sprite = self._rasterize(self.resolve_text(text))
+        self._sprites[text] = sprite
+        if len(self._sprites) > self.max_cached:
+            self._sprites.popitem(last=False)
+        return sprite
+
+    def _rasterize(self, text):
+        """Draw each pass onto its own coverage mask, cropped to the caption box"""
+        measure = ImageDraw.Draw(Image.new("L", (1, 1)))
+        bbox = measure.textbbox((0, 0), text, font=self.font)
+        text_width = bbox[2] - bbox[0]
+        text_height = bbox[3] - bbox[1]
+
+        # Same anchor the full-frame renderer used
+        x = (self.width - text_width) // 2
+        y = (self.height - text_height) // 2
+
+        # Generous box around every pass; trimmed to real coverage below
+        pad = 2 * self.outline_width + 2
+        box_x = x + bbox[0] - pad
+        box_y = y + bbox[1] - pad
+        box_w = text_width + 2 * pad
+        box_h = text_height + 2 * pad
+
+        masks = []
+        for (dx, dy), _ in self.passes:
+            layer = Image.new("L", (box_w, box_h), 0)
+            ImageDraw.Draw(layer).text((x + dx - box_x, y + dy - box_y), text, font=self.font, fill=255)
+            masks.append(np.asarray(layer))
+
+        coverage = np.any(np.stack(masks), axis=0)
+        rows = np.flatnonzero(coverage.any(axis=1))
+        cols = np.flatnonzero(coverage.any(axis=0))
+        if rows.size == 0:
+            empty = [np.zeros((0, 0), dtype=np.uint8)] * len(masks)
+            return CaptionSprite(0, 0, empty, [color for _, color in self.passes])
+
+        top, bottom = rows[0], rows[-1] + 1
+        left, right = cols[0], cols[-1] + 1
+        masks = [mask[top:bottom, left:right] for mask in masks]
+        return CaptionSprite(box_x + left, box_y + top, masks, [color for _, color in self.passes])
+
+    def render(self, frame, text):
+        """Alpha-blend the caption onto the frame in place, touching only its bounding box"""
+        sprite = self.get_sprite(text)
+
+        # Clip the sprite against the frame edges
+        x0 = max(sprite.x, 0)
+        y0 = max(sprite.y, 0)
+        x1 = min(sprite.x + sprite.width, frame.shape[1])
+        y1 = min(sprite.y + sprite.height, frame.shape[0])
+        if x0 >= x1 or y0 >= y1:
+            return frame
+
+        sx = x0 - sprite.x
+        sy = y0 - sprite.y
+        roi = frame[y0:y1, x0:x1].astype(np.uint16)
+
+        rows = slice(sy, sy + (y1 - y0))
+        cols = slice(sx, sx + (x1 - x0))
+        for inverse, base in sprite.layers:
+            # Same integer blend PIL uses for text fills, so output is identical
+            roi *= inverse[rows, cols]
+            roi += base[rows, cols]
+            roi += roi >> 8
+            roi >>= 8
+
+        frame[y0:y1, x0:x1] = roi
+        return frame
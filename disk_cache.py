@@ -0,0 +1,114 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+import logging
+import tempfile
+import threading
+
+
+def file_digest(path):
+    """SHA-256 of a file's content, read in blocks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class DiskCache:
+    """Content-addressed file cache with size-based LRU eviction"""
+
+    def __init__(self, cache_dir, max_bytes):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def key(*parts):
+        """Stable hash of the values that determine an entry's content"""
+        payload = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def path(self, key, suffix=""):
+        return os.path.join(self.cache_dir, f"{key}{suffix}")
+
+    def get(self, key, suffix=""):
+        """Return the cached file path, or None, marking the entry as recently used"""
+        path = self.path(key, suffix)
+        try:
+            now = time.time()
+            os.utime(path, (now, now))
+            return path
+        except OSError:
+            return None
+
+    def put(self, key, source_path, suffix="", move=False):
+        """Copy (or move) a file into the cache and evict old entries if over budget"""
+        path = self.path(key, suffix)
+        fd, temp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".partial")
+        os.close(fd)
+        try:
+            if move:
+                shutil.move(source_path, temp_path)  # A rename when on the same filesystem
+            else:
+                shutil.copyfile(source_path, temp_path)
+            os.replace(temp_path, path)
+        except Exception:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        self.evict(keep=path)
+        return path
+
+    def get_bytes(self, key, suffix=""):
+        path = self.get(key, suffix)
+        if path is None:
+            return None
+        try:
+            with open(path, 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def put_bytes(self, key, data, suffix=""):
+        path = self.path(key, suffix)
+        fd, temp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".partial")
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(temp_path, path)
+        except Exception:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        self.evict(keep=path)
+        return path
+
+    def evict(self, keep=None):
+        """Delete least recently used entries until the cache fits its size budget
+
+        keep is a path that stays even if it alone is over budget: the entry just written,
+        which the caller is about to use.
+        """
+        with self._lock:
+            entries = []
+            total = 0
+            for entry in os.scandir(self.cache_dir):
+                if not entry.is_file() or entry.name.endswith(".partial") or entry.path == keep:
+                    continue
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+
+            entries.sort()
+            for _, size, path in entries:
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                    total -= size
+                except OSError as e:
+                    logging.warning(f"Could not evict cache entry {path}: {str(e)}")
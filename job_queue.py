@@ -0,0 +1,235 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import logging
+import threading
+from utils import process_singleton
+from telemetry import ProgressBus, get_telemetry, get_progress_bus
+
+
+def default_worker_count():
+    """Concurrent jobs the machine can run without oversubscribing its cores
+
+    A render keeps about two cores busy (the Python frame loop plus the ffmpeg encoder),
+    more when segments render in parallel.
+    """
+    try:
+        cores = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cores = os.cpu_count() or 1
+    cores_per_job = 2 * max(1, int(os.getenv("GENZIFY_RENDER_WORKERS", "1")))
+    return max(1, cores // cores_per_job)
+
+
+class JobQueue:
+    """Persistent SQLite job queue drained by a fixed pool of worker threads
+
+    handler(job_id, payload, report) does the work and returns a JSON-serializable
+    result; report(progress, message) publishes to the progress bus, which this queue
+    subscribes to so pollers can read progress from the jobs table.
+    """
+
+    def __init__(self, db_path, handler, workers=None, max_jobs_per_user=1, max_queued=20,
+                 progress_interval=0.5, retention=7 * 24 * 3600, progress_bus=None, telemetry=None):
+        self.handler = handler
+        self.workers = workers or default_worker_count()
+        self.max_jobs_per_user = max_jobs_per_user  # Queued or running jobs one user may hold
+        self.max_queued = max_queued  # Waiting jobs beyond this are turned away
+        self.retention = retention  # Finished jobs are forgotten after this long
+        self.telemetry = telemetry or get_telemetry()
+        # Updates are throttled by the bus: progress_interval is the minimum gap between writes
+        self.progress_bus = progress_bus or ProgressBus(progress_interval, self.telemetry)
+        self.progress_bus.subscribe(self._record_progress)
+
+        self._db_lock = threading.Lock()
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id TEXT PRIMARY KEY, user_id TEXT NOT NULL, status TEXT NOT NULL, "
+            "progress REAL NOT NULL DEFAULT 0, message TEXT, payload TEXT NOT NULL, "
+            "result TEXT, error TEXT, created_at REAL NOT NULL, started_at REAL, finished_at REAL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)")
+        self._db.commit()
+
+        self._wakeup = threading.Condition()
+        self._stopping = False
+        self._threads = []
+
+    def start(self):
+        """Requeue work interrupted by a restart and start the worker threads"""
+        now = time.time()
+        with self._db_lock:
+            requeued = self._db.execute(
+                "UPDATE jobs SET status = 'queued', progress = 0, message = 'Restarting after interruption', "
+                "started_at = NULL WHERE status = 'running'"
+            ).rowcount
+            self._db.execute(
+                "DELETE FROM jobs WHERE status NOT IN ('queued', 'running') AND finished_at < ?",
+                (now - self.retention,)
+            )
+            self._db.commit()
+        if requeued:
+            logging.info(f"Requeued {requeued} interrupted jobs")
+
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f"job-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def stop(self, timeout=None):
+        """Let running jobs finish, then stop the workers"""
+        with self._wakeup:
+            self._stopping = True
+            self._wakeup.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def submit(self, user_id, payload):
+        """Queue a job and return its id, or raise if admission control turns it away"""
+        job_id = uuid.uuid4().hex
+        with self._db_lock:
+            active = self._db.execute(
+                "SELECT COUNT(*) FROM jobs WHERE user_id = ? AND status IN ('queued', 'running')", (user_id,)
+            ).fetchone()[0]
+            if active >= self.max_jobs_per_user:
+                raise Exception(
+                    f"You already have {active} video(s) in progress. Please wait for them to finish."
+                )
+
+            queued = self._db.execute("SELECT COUNT(*) FROM jobs WHERE status = 'queued'").fetchone()[0]
+            if queued >= self.max_queued:
+                raise Exception("The server is busy right now. Please try again in a few minutes.")
+
+            self._db.execute(
+                "INSERT INTO jobs (id, user_id, status, message, payload, created_at) "
+                "VALUES (?, ?, 'queued', 'Waiting in queue...', ?, ?)",
+                (job_id, user_id, json.dumps(payload), time.time())
+            )
+            self._db.commit()
+
+        with self._wakeup:
+            self._wakeup.notify()
+        return job_id
+
+    def get(self, job_id):
+        """Status record for a job as a dict, or None; queued jobs include their queue position"""
+        with self._db_lock:
+            row = self._db.execute(
+                "SELECT id, user_id, status, progress, message, result, error, created_at, started_at, finished_at "
+                "FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            job = dict(zip(
+                ("id", "user_id", "status", "progress", "message", "result", "error",
+                 "created_at", "started_at", "finished_at"), row
+            ))
+            if job["status"] == "queued":
+                job["position"] = self._db.execute(
+                    "SELECT COUNT(*) FROM jobs WHERE status = 'queued' AND created_at < ?", (job["created_at"],)
+                ).fetchone()[0]
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def active_jobs(self, user_id):
+        """Ids of a user's queued and running jobs, oldest first"""
+        with self._db_lock:
+            rows = self._db.execute(
+                "SELECT id FROM jobs WHERE user_id = ? AND status IN ('queued', 'running') ORDER BY created_at",
+                (user_id,)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def stats(self):
+        """Job counts by status, for watching load"""
+        with self._db_lock:
+            rows = self._db.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        stats = dict(rows)
+        stats["workers"] = self.workers
+        return stats
+
+    def _claim(self):
+        """Atomically move the oldest queued job to running"""
+        with self._db_lock:
+            row = self._db.execute(
+                "SELECT id, payload, created_at FROM jobs WHERE status = 'queued' ORDER BY created_at LIMIT 1"
+            ).fetchone()
+            if row is None:
+                return None
+            self._db.execute(
+                "UPDATE jobs SET status = 'running', started_at = ?, message = 'Starting...' WHERE id = ?",
+                (time.time(), row[0])
+            )
+            self._db.commit()
+        self.telemetry.observe("job_queue_wait_seconds", time.time() - row[2])
+        return row[0], json.loads(row[1])
+
+    def _worker(self):
+        while True:
+            with self._wakeup:
+                if self._stopping:
+                    return
+            job = self._claim()
+            if job is None:
+                with self._wakeup:
+                    if not self._stopping:
+                        self._wakeup.wait(timeout=1.0)
+                continue
+            self._run(*job)
+
+    def _run(self, job_id, payload):
+        try:
+            result = self.handler(job_id, payload, self.progress_bus.reporter(job_id))
+        except Exception as e:
+            logging.error(f"Job {job_id} failed: {str(e)}")
+            self._finish(job_id, "failed", error=str(e))
+        else:
+            self._finish(job_id, "done", result=json.dumps(result))
+        finally:
+            self.progress_bus.finish(job_id)
+
+    def _record_progress(self, event):
+        """Bus subscriber: store the latest progress of a running job"""
+        with self._db_lock:
+            self._db.execute(
+                "UPDATE jobs SET progress = ?, message = ? WHERE id = ? AND status = 'running'",
+                (event.progress, event.message, event.job_id)
+            )
+            self._db.commit()
+
+    def _finish(self, job_id, status, result=None, error=None):
+        self.telemetry.count("jobs_total", status=status)
+        with self._db_lock:
+            self._db.execute(
+                "UPDATE jobs SET status = ?, progress = CASE WHEN ? = 'done' THEN 1 ELSE progress END, "
+                "result = ?, error = ?, finished_at = ?, message = ? WHERE id = ?",
+                (status, status, result, error, time.time(), "Done" if status == "done" else "Failed", job_id)
+            )
+            self._db.commit()
+
+
+def _run_job(job_id, payload, report):
+    """Queue handler; the render stack (OpenCV, PIL, gTTS) is imported when the first job starts"""
+    from pipeline import run_share_job, run_video_job
+    if payload.get("kind") == "share":
+        return run_share_job(job_id, payload, report)
+    return run_video_job(job_id, payload, report)
+
+
+@process_singleton
+def get_job_queue():
+    """The queue every session submits to, so they share the same workers and limits"""
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    workers = os.getenv("GENZIFY_JOB_WORKERS")
+    return JobQueue(
+        os.path.join(base_dir, "jobs.sqlite3"),
+        _run_job,
+        workers=int(workers) if workers else None,
+        max_jobs_per_user=int(os.getenv("GENZIFY_JOBS_PER_USER", "1")),
+        max_queued=int(os.getenv("GENZIFY_MAX_QUEUED_JOBS", "20")),
+        progress_bus=get_progress_bus()
+    ).start()
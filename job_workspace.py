@@ -0,0 +1,48 @@
+import os
+import uuid
+import shutil
+import logging
+import tempfile
+
+
+def get_temp_root():
+    """Root for job workspaces; point GENZIFY_TEMP_ROOT at tmpfs to keep scratch files in RAM"""
+    return os.getenv("GENZIFY_TEMP_ROOT") or os.path.join(tempfile.gettempdir(), "genzify")
+
+
+class JobWorkspace:
+    """Private scratch directory for one generation job"""
+
+    def __init__(self, job_id=None, temp_root=None):
+        self.id = job_id or uuid.uuid4().hex
+        self.temp_root = temp_root or get_temp_root()
+        self.dir = os.path.join(self.temp_root, f"job_{self.id}")
+        os.makedirs(self.dir, exist_ok=True)
+
+    def path(self, name):
+        """Absolute path for a file inside this job's directory"""
+        return os.path.join(self.dir, name)
+
+    def link(self, source, name):
+        """Hard-link (or copy) a file into this job's directory so it outlives its source"""
+        path = self.path(name)
+        try:
+            os.link(source, path)
+        except OSError:
+            shutil.copyfile(source, path)
+        return path
+
+    def cleanup(self):
+        """Delete this job's directory and everything in it"""
+        try:
+            shutil.rmtree(self.dir)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logging.warning(f"Could not clean up workspace {self.dir}: {str(e)}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.cleanup()
@@ -0,0 +1,250 @@
+import os
+import re
+import time
+import random
+import asyncio
+import logging
+import threading
+import httpx
+from groq import Groq, AsyncGroq, APIConnectionError, APIStatusError
+from utils import process_singleton
+from telemetry import get_telemetry
+
+_DURATION_RE = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+def _parse_duration(value):
+    """Seconds from a Groq reset header such as '7.66s', '2m59.56s' or '450ms'"""
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION_RE.findall(value)
+    if not parts:
+        return None
+    return sum(float(amount) * _DURATION_UNITS[unit] for amount, unit in parts)
+
+
+def rate_limit_delay(headers):
+    """Seconds the server asked us to wait, from retry-after or the rate-limit reset headers"""
+    if headers is None:
+        return None
+    if headers.get("retry-after-ms"):
+        try:
+            return float(headers["retry-after-ms"]) / 1000
+        except ValueError:
+            pass
+    delay = _parse_duration(headers.get("retry-after"))
+    if delay is not None:
+        return delay
+
+    # No retry-after: wait for whichever exhausted budget resets
+    delays = []
+    for budget in ("requests", "tokens"):
+        if headers.get(f"x-ratelimit-remaining-{budget}") == "0":
+            reset = _parse_duration(headers.get(f"x-ratelimit-reset-{budget}"))
+            if reset is not None:
+                delays.append(reset)
+    return max(delays) if delays else None
+
+
+def is_retryable(error):
+    """Connection problems, timeouts, 408/409/429 and 5xx may succeed later; other 4xx never will"""
+    if isinstance(error, APIConnectionError):  # Includes APITimeoutError
+        return True
+    if isinstance(error, APIStatusError):
+        return error.status_code in (408, 409, 429) or error.status_code >= 500
+    return False
+
+
+class LLMClient:
+    """Process-wide Groq client: pooled connections, global concurrency limit and backoff"""
+
+    def __init__(self, api_key=None, base_url=None, max_concurrency=8, max_retries=5,
+                 base_delay=0.5, max_delay=20.0, request_timeout=60.0):
+        self.api_key = api_key or os.getenv('GROQ_API_KEY')
+        self.base_url = base_url or os.getenv('GROQ_BASE_URL') or None  # e.g. a local stub server
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.request_timeout = request_timeout
+
+        # Retries happen here, not inside the SDK, so they can honour the shared cooldown
+        self._limits = httpx.Limits(
+            max_connections=max_concurrency, max_keepalive_connections=max_concurrency
+        )
+        self.client = Groq(
+            api_key=self.api_key, base_url=self.base_url, max_retries=0,
+            timeout=request_timeout, http_client=httpx.Client(limits=self._limits, timeout=request_timeout)
+        )
+        self._async_by_loop = {}  # event loop -> (AsyncGroq, semaphore)
+        self._async_lock = threading.Lock()
+
+        self._semaphore = threading.BoundedSemaphore(max_concurrency)
+        self._cooldown_lock = threading.Lock()
+        self._not_before = 0.0  # Monotonic time before which nobody should call the API
+        self._counters = {"requests": 0, "retries": 0, "rate_limited": 0, "failed": 0}
+        self.telemetry = get_telemetry()
+
+    def create(self, timeout=None, **params):
+        """chat.completions.create with retries; timeout bounds the whole call including waits"""
+        deadline = time.monotonic() + timeout if timeout else None
+        attempt = 0
+        with self.telemetry.span("llm_request", mode="create"):
+            while True:
+                self._wait_for_cooldown(deadline)
+                try:
+                    with self._semaphore:
+                        self._count("requests")
+                        return self.client.chat.completions.create(
+                            timeout=self._attempt_timeout(deadline), **params
+                        )
+                except Exception as e:
+                    delay = self._handle_failure(e, attempt, deadline)
+                time.sleep(delay)
+                attempt += 1
+
+    def stream(self, timeout=None, **params):
+        """Yield streamed completion chunks, holding a concurrency slot until the stream ends
+
+        Opening the stream is retried like create(); once chunks have been yielded a
+        failure is raised, since the caller has already consumed part of the answer.
+        """
+        deadline = time.monotonic() + timeout if timeout else None
+        attempt = 0
+        with self.telemetry.span("llm_request", mode="stream"):
+            while True:
+                self._wait_for_cooldown(deadline)
+                with self._semaphore:
+                    try:
+                        self._count("requests")
+                        stream = self.client.chat.completions.create(
+                            timeout=self._attempt_timeout(deadline), stream=True, **params
+                        )
+                    except Exception as e:
+                        delay = self._handle_failure(e, attempt, deadline)
+                    else:
+                        try:
+                            for chunk in stream:
+                                yield chunk
+                        finally:
+                            stream.response.close()
+                        return
+                time.sleep(delay)
+                attempt += 1
+
+    async def acreate(self, timeout=None, **params):
+        """Async create(): same retry policy and cooldown, limited by an asyncio semaphore"""
+        client, semaphore = self._async_resources()
+        deadline = time.monotonic() + timeout if timeout else None
+        attempt = 0
+        start = time.perf_counter()
+        while True:
+            wait = self._cooldown_wait(deadline)
+            if wait:
+                await asyncio.sleep(wait)
+            try:
+                async with semaphore:
+                    self._count("requests")
+                    response = await client.chat.completions.create(
+                        timeout=self._attempt_timeout(deadline), **params
+                    )
+                # Not a span: coroutines interleave on one thread, so there is no nesting to track
+                self.telemetry.observe("span_seconds", time.perf_counter() - start, span="llm_request", mode="async")
+                return response
+            except Exception as e:
+                delay = self._handle_failure(e, attempt, deadline)
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    def stats(self):
+        """Request, retry and rate-limit counters"""
+        with self._cooldown_lock:
+            return dict(self._counters)
+
+    def _async_resources(self):
+        # One client and semaphore per event loop: both are bound to the loop that first uses them,
+        # and each asyncio.run() starts a new one
+        loop = asyncio.get_running_loop()
+        with self._async_lock:
+            for closed in [other for other in self._async_by_loop if other.is_closed()]:
+                del self._async_by_loop[closed]
+            resources = self._async_by_loop.get(loop)
+            if resources is None:
+                client = AsyncGroq(
+                    api_key=self.api_key, base_url=self.base_url, max_retries=0,
+                    timeout=self.request_timeout,
+                    http_client=httpx.AsyncClient(limits=self._limits, timeout=self.request_timeout)
+                )
+                resources = self._async_by_loop[loop] = (client, asyncio.BoundedSemaphore(self.max_concurrency))
+            return resources
+
+    def _handle_failure(self, error, attempt, deadline):
+        """Seconds to wait before retrying, or raise if the error is fatal or time is up"""
+        if not is_retryable(error) or attempt >= self.max_retries:
+            self._count("failed")
+            raise error
+
+        response = getattr(error, "response", None)
+        server_delay = rate_limit_delay(response.headers) if response is not None else None
+        if server_delay is not None:
+            # Everyone waits out the server's reset, with a little jitter to spread the restart
+            delay = server_delay + random.uniform(0, self.base_delay)
+            self._extend_cooldown(delay)
+        else:
+            # Full jitter exponential backoff
+            delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+        if getattr(error, "status_code", None) == 429:
+            self._count("rate_limited")
+        if deadline is not None and time.monotonic() + delay >= deadline:
+            self._count("failed")
+            raise Exception("Request timed out. Please try again.")
+
+        self._count("retries")
+        logging.warning(f"LLM request failed ({str(error)}), retrying in {delay:.2f}s")
+        return delay
+
+    def _attempt_timeout(self, deadline):
+        if deadline is None:
+            return self.request_timeout
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise Exception("Request timed out. Please try again.")
+        return min(self.request_timeout, remaining)
+
+    def _extend_cooldown(self, delay):
+        with self._cooldown_lock:
+            self._not_before = max(self._not_before, time.monotonic() + delay)
+
+    def _cooldown_wait(self, deadline):
+        with self._cooldown_lock:
+            wait = self._not_before - time.monotonic()
+        if wait <= 0:
+            return 0
+        if deadline is not None and time.monotonic() + wait >= deadline:
+            raise Exception("Request timed out. Please try again.")
+        return wait
+
+    def _wait_for_cooldown(self, deadline):
+        wait = self._cooldown_wait(deadline)
+        if wait:
+            time.sleep(wait)
+
+    def _count(self, name):
+        with self._cooldown_lock:
+            self._counters[name] += 1
+        self.telemetry.count(f"llm_{name}_total")
+
+
+@process_singleton
+def get_llm_client():
+    """The client every session uses, so they share the connection pool and the rate limit"""
+    return LLMClient(
+        max_concurrency=int(os.getenv('GENZIFY_LLM_CONCURRENCY', '8')),
+        max_retries=int(os.getenv('GENZIFY_LLM_MAX_RETRIES', '5'))
+    )
@@ -1,66 +1,278 @@
 import os
+import re
 import logging
-from groq import Groq
+import hashlib
 import time
+from concurrent.futures import ThreadPoolExecutor
+from retrieval import estimate_tokens, get_index
+from disk_cache import DiskCache
+from response_cache import ResponseCache, get_response_cache
+from llm_client import get_llm_client
+from telemetry import get_telemetry
 
 class LLMHandler:
     def __init__(self):
-        self.client = Groq(
-            api_key=os.getenv('GROQ_API_KEY')
-        )
+        # Shared per process: pooled connections, backoff and a global concurrency limit
+        self.client = get_llm_client()
+        self.model = "llama-3.1-70b-versatile"  # or your preferred Groq model
+        self.context_token_budget = 3000  # Context tokens sent with each question
+        self.retrieval_top_k = 8
+        
+        # Long documents are summarized section by section, with section summaries cached
+        self.summary_chunk_tokens = 6000
+        self.summary_max_workers = 4
+        base_dir = os.path.dirname(os.path.abspath(__file__))
+        self.summary_cache = DiskCache(os.path.join(base_dir, "summary_cache"), 50 * 1024 * 1024)
+        
+        # Identical requests are answered from the shared cache or share one upstream call
+        self.response_cache = get_response_cache()
+        self.telemetry = get_telemetry()
 
-    def generate_summary(self, text_content, timeout=30):
-        """Generate summary with timeout"""
+    def generate_summary(self, text_content, timeout=30, refresh=False):
+        """Generate summary with timeout; refresh asks for a new one instead of the cached summary"""
         try:
-            start_time = time.time()
-            
-            messages = [
-                {"role": "system", "content": "You are a helpful assistant that creates concise summaries."},
-                {"role": "user", "content": f"Please create a clear, concise summary of the following text, focusing on the key points: {text_content}"}
-            ]
-            
-            while time.time() - start_time < timeout:
-                try:
-                    response = self.client.chat.completions.create(
-                        model="llama-3.1-70b-versatile",  # or your preferred Groq model
-                        messages=messages,
-                        max_tokens=500,
-                        temperature=0.7
-                    )
-                    
-                    return response.choices[0].message.content
-                    
-                except Exception as e:
-                    if time.time() - start_time >= timeout:
-                        raise Exception("Request timed out. Please try again.")
-                    time.sleep(1)  # Wait before retrying
-            
-            raise Exception("Request timed out. Please try again.")
+            return self._summarize(self._summary_prompt(text_content, timeout), timeout, refresh)
             
         except Exception as e:
             raise Exception(f"Error generating summary: {str(e)}")
 
-    def generate_answer(self, question, context, genzify=False):
-        """Generate answer with Groq"""
+    def stream_summary(self, text_content, timeout=30, refresh=False):
+        """Summary as an AnswerStream, so later stages can start on its first sentences"""
         try:
-            system_prompt = """You are a helpful assistant."""
-            if genzify:
-                system_prompt = """You are a Gen Z expert who responds in Gen Z style language. 
-                Use emojis, slang, and casual tone while keeping the information accurate.Make it as much Genz Language like as possible"""
-
-            messages = [
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": f"Context: {context}\n\nQuestion: {question}"}
-            ]
-
-            response = self.client.chat.completions.create(
-                model="llama-3.1-70b-versatile",
+            messages = self._summary_messages(self._summary_prompt(text_content, timeout))
+        except Exception as e:
+            raise Exception(f"Error generating summary: {str(e)}")
+        key = ResponseCache.key(self.model, messages, 500, 0.7)
+        return AnswerStream(self, messages, key, kind="summary", refresh=refresh, timeout=timeout)
+
+    def _summary_prompt(self, text_content, timeout):
+        """Prompt for the final summary request"""
+        if estimate_tokens(text_content) > self.summary_chunk_tokens:
+            # Too long for one request: summarize sections concurrently, then merge them
+            return self._map_reduce_prompt(text_content, timeout)
+        return f"Please create a clear, concise summary of the following text, focusing on the key points: {text_content}"
+
+    def _summary_messages(self, prompt):
+        return [
+            {"role": "system", "content": "You are a helpful assistant that creates concise summaries."},
+            {"role": "user", "content": prompt}
+        ]
+
+    def _summarize(self, prompt, timeout, refresh=False):
+        """Run one summary request, retrying transient failures until the timeout"""
+        messages = self._summary_messages(prompt)
+        
+        def request():
+            response = self.client.create(
+                timeout=timeout,
+                model=self.model,
                 messages=messages,
                 max_tokens=500,
                 temperature=0.7
             )
-
             return response.choices[0].message.content
+        
+        if refresh:
+            # A new take replaces the cached one, so a later confirm renders what was previewed
+            summary = request()
+            self.response_cache.put(ResponseCache.key(self.model, messages, 500, 0.7), summary)
+            return summary
+        return self._cached_completion(messages, 500, 0.7, request)
+
+    def _map_reduce_prompt(self, text_content, timeout):
+        """Summarize token-bounded sections in parallel; the prompt merges the partial summaries"""
+        chunks = self._split_summary_chunks(text_content)
+        with ThreadPoolExecutor(max_workers=self.summary_max_workers) as pool:
+            partials = list(pool.map(lambda chunk: self._summarize_chunk(chunk, timeout), chunks))
+        
+        merged = "\n\n".join(partials)
+        if estimate_tokens(merged) > self.summary_chunk_tokens:
+            # Still too long to merge in one request: reduce another level
+            return self._map_reduce_prompt(merged, timeout)
+        
+        return (
+            "The following are summaries of consecutive sections of one document. "
+            f"Combine them into a single clear, concise summary of the whole text, focusing on the key points: {merged}"
+        )
+
+    def _summarize_chunk(self, chunk, timeout):
+        """Summary of one section, reused from the cache while the section is unchanged"""
+        prompt = f"Please create a clear, concise summary of this section of a longer text, focusing on the key points: {chunk}"
+        key = DiskCache.key(self.model, prompt)
+        cached = self.summary_cache.get_bytes(key, ".txt")
+        if cached is not None:
+            return cached.decode('utf-8')
+        
+        summary = self._summarize(prompt, timeout)
+        self.summary_cache.put_bytes(key, summary.encode('utf-8'), ".txt")
+        return summary
+
+    def _split_summary_chunks(self, text):
+        """Split text into token-bounded sections at content-defined sentence boundaries
+
+        A boundary depends only on the sentence it follows, so an edit only changes the
+        sections around it and every other section keeps hitting the summary cache.
+        """
+        max_tokens = self.summary_chunk_tokens
+        min_tokens = max_tokens // 2
+        
+        chunks = []
+        current = []
+        current_tokens = 0
+        for sentence in self._bounded_sentences(text, max_tokens):
+            sentence_tokens = estimate_tokens(sentence)
+            if current and current_tokens + sentence_tokens > max_tokens:
+                chunks.append(" ".join(current))
+                current, current_tokens = [], 0
+            
+            current.append(sentence)
+            current_tokens += sentence_tokens
+            
+            marker = int(hashlib.md5(sentence.encode('utf-8')).hexdigest()[:8], 16)
+            if current_tokens >= min_tokens and marker % 8 == 0:
+                chunks.append(" ".join(current))
+                current, current_tokens = [], 0
+        
+        if current:
+            chunks.append(" ".join(current))
+        return chunks
+
+    @staticmethod
+    def _bounded_sentences(text, max_tokens):
+        """Sentences of text, with any over max_tokens (e.g. unpunctuated bullet lists) split between words"""
+        max_chars = (max_tokens - 1) * 4  # Inverse of estimate_tokens
+        for sentence in re.split(r'(?<=[.!?])\s+', text):
+            if estimate_tokens(sentence) <= max_tokens:
+                yield sentence
+                continue
+            piece, piece_chars = [], 0
+            for word in sentence.split():
+                if piece and piece_chars + len(word) > max_chars:
+                    yield " ".join(piece)
+                    piece, piece_chars = [], 0
+                piece.append(word)
+                piece_chars += len(word) + 1
+            if piece:
+                yield " ".join(piece)
+
+    def generate_answer(self, question, context, genzify=False):
+        """Generate answer with Groq"""
+        try:
+            messages = self._answer_messages(question, context, genzify)
+
+            def request():
+                response = self.client.create(
+                    model=self.model,
+                    messages=messages,
+                    max_tokens=500,
+                    temperature=0.7
+                )
+                return response.choices[0].message.content
+
+            return self._cached_completion(messages, 500, 0.7, request)
 
         except Exception as e:
-            raise Exception(f"Error generating answer: {str(e)}")
\ No newline at end of file
+            raise Exception(f"Error generating answer: {str(e)}")
+
+    def stream_answer(self, question, context, genzify=False):
+        """Answer as an AnswerStream that yields text pieces as Groq produces them"""
+        messages = self._answer_messages(question, context, genzify)
+        key = ResponseCache.key(self.model, messages, 500, 0.7)
+        return AnswerStream(self, messages, key)
+
+    def _answer_messages(self, question, context, genzify):
+        system_prompt = """You are a helpful assistant."""
+        if genzify:
+            system_prompt = """You are a Gen Z expert who responds in Gen Z style language. 
+            Use emojis, slang, and casual tone while keeping the information accurate.Make it as much Genz Language like as possible"""
+
+        context = self._select_context(question, context)
+
+        return [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": f"Context: {context}\n\nQuestion: {question}"}
+        ]
+
+    def _select_context(self, question, context):
+        """Send the whole document if it fits the budget, otherwise only its most relevant passages"""
+        if estimate_tokens(context) <= self.context_token_budget:
+            return context
+        return get_index(context).build_context(question, self.context_token_budget, self.retrieval_top_k)
+
+    def _cached_completion(self, messages, max_tokens, temperature, request):
+        """Serve a completion from the response cache, calling upstream at most once per key"""
+        key = ResponseCache.key(self.model, messages, max_tokens, temperature)
+        return self.response_cache.get_or_compute(key, request)
+
+    def cache_stats(self):
+        """Response cache hit/miss counters"""
+        return self.response_cache.stats()
+
+
+class AnswerStream:
+    """Iterable over answer text pieces that records perceived latency for its request"""
+
+    def __init__(self, handler, messages, cache_key, kind="answer", refresh=False, timeout=None):
+        self.handler = handler
+        self.messages = messages
+        self.cache_key = cache_key
+        self.kind = kind  # "answer" or "summary", for errors and logs
+        self.refresh = refresh  # Skip the cached answer and store the new one in its place
+        self.timeout = timeout  # Seconds to open the stream, and the longest wait for each next piece
+        self.text = None  # The whole answer, once streamed
+        self.time_to_first_token = None  # Seconds until the first text piece arrived
+        self.total_time = None  # Seconds until the answer was complete
+        self.cached = False
+
+    def cached_text(self):
+        """The stored answer if there is one (and refresh wasn't asked for), without streaming it"""
+        return None if self.refresh else self.handler.response_cache.get(self.cache_key)
+
+    def __iter__(self):
+        start = time.perf_counter()
+        try:
+            cached = None if self.refresh else self.handler.response_cache.get(self.cache_key)
+            if cached is not None:
+                self.cached = True
+                self.time_to_first_token = time.perf_counter() - start
+                self.text = cached
+                yield cached
+            else:
+                # Identical requests in flight share one upstream stream; the cache stores the result
+                parts = []
+                pieces = self.handler.response_cache.stream(self.cache_key, self._open_stream, self.timeout)
+                for piece in pieces:
+                    if self.time_to_first_token is None:
+                        self.time_to_first_token = time.perf_counter() - start
+                    parts.append(piece)
+                    yield piece
+                self.text = "".join(parts)
+
+        except Exception as e:
+            raise Exception(f"Error generating {self.kind}: {str(e)}")
+
+        self.total_time = time.perf_counter() - start
+        if not self.cached and self.time_to_first_token is not None:
+            self.handler.telemetry.observe("llm_first_token_seconds", self.time_to_first_token, kind=self.kind)
+        logging.info(
+            f"{self.kind.capitalize()} streamed: first token {self.time_to_first_token or 0:.3f}s, "
+            f"total {self.total_time:.3f}s, cached={self.cached}"
+        )
+
+    def _open_stream(self):
+        """Text pieces straight from Groq
+
+        The per-attempt timeout is also the HTTP read timeout, so a stalled stream fails
+        instead of waiting forever.
+        """
+        stream = self.handler.client.stream(
+            timeout=self.timeout,
+            model=self.handler.model,
+            messages=self.messages,
+            max_tokens=500,
+            temperature=0.7
+        )
+        for chunk in stream:
+            piece = chunk.choices[0].delta.content
+            if piece:
+                yield piece
\ No newline at end of file
@@ -1,58 +1,215 @@
 import PyPDF2
-import tempfile
+import io
 import os
-import time
+import json
+import hashlib
 import logging
+import threading
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from disk_cache import DiskCache
+from utils import process_singleton
+from telemetry import get_telemetry
+
+# Per-worker reader, parsed once from the PDF bytes handed to the pool initializer
+_worker_reader = None
+
+
+def _init_worker(data):
+    global _worker_reader
+    _worker_reader = PyPDF2.PdfReader(io.BytesIO(data))
+
+
+def _extract_pages(reader, start, end):
+    """Extract pages [start, end); pages that fail come back as None"""
+    pages = []
+    for page_num in range(start, end):
+        try:
+            pages.append((page_num, reader.pages[page_num].extract_text()))
+            logging.info(f"Successfully processed page {page_num + 1}")
+        except Exception as page_error:
+            logging.error(f"Error processing page {page_num + 1}: {str(page_error)}")
+            pages.append((page_num, None))
+    return pages
+
+
+def _extract_worker_pages(start, end):
+    return _extract_pages(_worker_reader, start, end)
+
+
+class ExtractedDocument:
+    """Extracted text of one PDF with its per-page layout"""
+
+    def __init__(self, sha256, pages):
+        self.sha256 = sha256
+        self.pages = pages  # [(page_num, text)] for every page that extracted
+        self.text = "".join(page_text + "\n" for _, page_text in pages)
+
+        # Character offset in text where each page starts
+        self.page_offsets = []
+        offset = 0
+        for _, page_text in pages:
+            self.page_offsets.append(offset)
+            offset += len(page_text) + 1
+
+    def to_json(self):
+        return json.dumps({"sha256": self.sha256, "pages": self.pages})
+
+    @classmethod
+    def from_json(cls, payload):
+        data = json.loads(payload)
+        return cls(data["sha256"], [tuple(page) for page in data["pages"]])
+
+
+class ExtractionCache:
+    """Extracted documents by content hash: process memory first, then a bounded disk store"""
+
+    def __init__(self, cache_dir, max_memory_chars=64 * 1024 * 1024, max_disk_bytes=512 * 1024 * 1024):
+        self.max_memory_chars = max_memory_chars
+        self.disk = DiskCache(cache_dir, max_disk_bytes)
+        self._memory = OrderedDict()
+        self._memory_chars = 0
+        self._lock = threading.Lock()
+
+    def get(self, digest):
+        with self._lock:
+            document = self._memory.get(digest)
+            if document is not None:
+                self._memory.move_to_end(digest)
+                return document
+
+        payload = self.disk.get_bytes(digest, ".json")
+        if payload is None:
+            return None
+        try:
+            document = ExtractedDocument.from_json(payload.decode('utf-8'))
+        except (ValueError, KeyError) as e:
+            logging.warning(f"Ignoring unreadable extraction cache entry {digest}: {str(e)}")
+            return None
+        self._remember(document)
+        return document
+
+    def put(self, document):
+        self.disk.put_bytes(document.sha256, document.to_json().encode('utf-8'), ".json")
+        self._remember(document)
+
+    def _remember(self, document):
+        with self._lock:
+            if document.sha256 in self._memory:
+                self._memory.move_to_end(document.sha256)
+                return
+            self._memory[document.sha256] = document
+            self._memory_chars += len(document.text)
+            while self._memory_chars > self.max_memory_chars and len(self._memory) > 1:
+                _, evicted = self._memory.popitem(last=False)
+                self._memory_chars -= len(evicted.text)
+
+
+@process_singleton
+def get_extraction_cache():
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    return ExtractionCache(os.path.join(base_dir, "pdf_cache"))
+
 
 class PDFProcessor:
+    def __init__(self, parallel_threshold=64, pages_per_task=16, max_workers=None, cache=None,
+                 max_upload_digests=256):
+        self.parallel_threshold = parallel_threshold  # Page count above which a process pool is used
+        self.pages_per_task = pages_per_task
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.cache = cache or get_extraction_cache()
+        self.max_upload_digests = max_upload_digests
+        self._upload_digests = OrderedDict()  # (file_id, size) -> sha256, so reruns skip re-hashing
+        self._upload_digests_lock = threading.Lock()  # One processor serves every session
+        self.telemetry = get_telemetry()
+
     def extract_text(self, pdf_file):
-        temp_file = None
-        pdf_reader = None
         try:
-            # Validate file name and type
-            if not pdf_file.name.lower().endswith('.pdf'):
-                raise Exception("Invalid file type. Please upload a PDF file.")
-            
-            # Log file details
-            logging.info(f"Processing file: {pdf_file.name}, size: {pdf_file.size} bytes")
-            
-            # Create a temporary file to handle StreamlitUploadedFile
-            temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.pdf')
-            temp_file.write(pdf_file.getvalue())
-            temp_file.close()  # Close the file explicitly
-            
-            # Open PDF with PyPDF2
-            with open(temp_file.name, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                text = ""
-                for page_num, page in enumerate(pdf_reader.pages):
-                    try:
-                        page_text = page.extract_text()
-                        text += page_text + "\n"
-                        logging.info(f"Successfully processed page {page_num + 1}")
-                    except Exception as page_error:
-                        logging.error(f"Error processing page {page_num + 1}: {str(page_error)}")
-            
+            text = self.extract_document(pdf_file).text
+
             if not text.strip():
                 raise Exception("No text could be extracted from the PDF")
-                
+
             return text
-            
+
         except Exception as e:
             logging.error(f"PDF processing error: {str(e)}")
             raise Exception(f"Error processing PDF: {str(e)}")
-            
-        finally:
-            # Clean up: Make sure to close and delete the temp file
-            if pdf_reader:
-                del pdf_reader  # Release the PDF reader
-                
-            if temp_file:
-                try:
-                    # Add a small delay to ensure file is released
-                    time.sleep(0.1)
-                    if os.path.exists(temp_file.name):
-                        os.unlink(temp_file.name)
-                        logging.info("Temporary file cleaned up successfully")
-                except Exception as e:
-                    logging.warning(f"Could not delete temporary file: {str(e)}")
+
+    def extract_document(self, pdf_file):
+        """Extracted pages for an upload, served from the content-hash cache when possible"""
+        digest = self._digest(pdf_file)
+        document = self.cache.get(digest)
+        if document is not None:
+            self.telemetry.count("pdf_documents_total", cache="hit")
+            return document
+
+        with self.telemetry.span("pdf_extract") as span:
+            document = ExtractedDocument(digest, list(self.iter_pages(pdf_file)))
+            span.set(pages=len(document.pages), bytes=pdf_file.size)
+        self.telemetry.count("pdf_documents_total", cache="miss")
+        self.telemetry.count("pdf_pages_extracted_total", len(document.pages))
+        if document.text.strip():
+            self.cache.put(document)
+        return document
+
+    def _digest(self, pdf_file):
+        """SHA-256 of the upload, remembered per Streamlit upload id"""
+        upload_key = (getattr(pdf_file, "file_id", None), pdf_file.size)
+        if upload_key[0] is not None:
+            with self._upload_digests_lock:
+                digest = self._upload_digests.get(upload_key)
+                if digest is not None:
+                    self._upload_digests.move_to_end(upload_key)
+                    return digest
+
+        digest = hashlib.sha256(pdf_file.getvalue()).hexdigest()
+        if upload_key[0] is not None:
+            with self._upload_digests_lock:
+                self._upload_digests[upload_key] = digest
+                while len(self._upload_digests) > self.max_upload_digests:
+                    self._upload_digests.popitem(last=False)
+        return digest
+
+    def iter_pages(self, pdf_file):
+        """Yield (page_num, text) in page order as soon as each page is extracted"""
+        # Validate file name and type
+        if not pdf_file.name.lower().endswith('.pdf'):
+            raise Exception("Invalid file type. Please upload a PDF file.")
+
+        # Log file details
+        logging.info(f"Processing file: {pdf_file.name}, size: {pdf_file.size} bytes")
+
+        # Read straight from the in-memory upload, no temp file round trip
+        data = pdf_file.getvalue()
+        reader = PyPDF2.PdfReader(io.BytesIO(data))
+        page_count = len(reader.pages)
+
+        if page_count < self.parallel_threshold or self.max_workers < 2:
+            for start in range(0, page_count, self.pages_per_task):
+                end = min(start + self.pages_per_task, page_count)
+                for page_num, page_text in _extract_pages(reader, start, end):
+                    if page_text is not None:
+                        yield page_num, page_text
+            return
+
+        # Large documents: spread page ranges across processes, yield them back in order
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(
+            max_workers=self.max_workers, mp_context=context,
+            initializer=_init_worker, initargs=(data,)
+        ) as pool:
+            futures = [
+                pool.submit(_extract_worker_pages, start, min(start + self.pages_per_task, page_count))
+                for start in range(0, page_count, self.pages_per_task)
+            ]
+            try:
+                for future in futures:
+                    for page_num, page_text in future.result():
+                        if page_text is not None:
+                            yield page_num, page_text
+            finally:
+                # A consumer that stops early shouldn't wait for the remaining pages
+                for future in futures:
+                    future.cancel()
@@ -0,0 +1,191 @@
+import os
+import re
+import logging
+from llm_handler import LLMHandler
+from tts_handler import TTSHandler
+from video_generator import VideoGenerator
+from job_workspace import JobWorkspace
+from storage_manager import get_storage_manager
+from video_cache import get_video_cache
+from telemetry import get_telemetry
+
+# Sentence ends, plus line breaks so bullet lists without full stops still split
+_SENTENCE_BREAK = re.compile(r'(?<=[.!?])\s+|\n+')
+
+
+def sentence_chunks(pieces, first_chars=150, chunk_chars=500):
+    """Group streamed text pieces into whole-sentence chunks as soon as they complete
+
+    The first chunk is kept short so speech can start early; later ones are longer so
+    there are fewer synthesis requests.
+    """
+    buffer = ""
+    current = []
+    length = 0
+    target = first_chars
+    for piece in pieces:
+        buffer += piece
+        *sentences, buffer = _SENTENCE_BREAK.split(buffer)
+        for sentence in sentences:
+            if not sentence.strip():
+                continue
+            current.append(sentence.strip())
+            length += len(sentence) + 1
+            if length >= target:
+                yield " ".join(current)
+                current, length, target = [], 0, chunk_chars
+    
+    tail = " ".join(current + [buffer.strip()]).strip()
+    if tail:
+        yield tail
+
+
+class VideoPipeline:
+    """Summary, speech and video for one document, reporting overall progress"""
+
+    name = "staged"
+
+    # Share of the overall progress bar given to each stage
+    SUMMARY_SHARE = 0.1
+    SPEECH_SHARE = 0.2
+
+    def __init__(self, llm_handler=None, tts_handler=None, video_generator=None):
+        self.llm_handler = llm_handler or LLMHandler()
+        self.tts_handler = tts_handler or TTSHandler()
+        self.video_generator = video_generator or VideoGenerator()
+        self.telemetry = get_telemetry()
+
+    def run(self, text_content, workspace, progress_callback, summary=None, refresh=False):
+        """Generate the video; returns {"video_path", "video_url", "summary"}
+
+        progress_callback(progress, message) gets overall progress. A given summary (one the
+        user already previewed) skips the LLM; refresh asks the LLM for a new take. A video
+        made before from the same summary and speech is returned from the video cache, as its
+        file or, if that was evicted, its storage URL.
+        """
+        if summary is None:
+            progress_callback(0.0, "Generating summary...")
+            with self.telemetry.span("summary"):
+                summary = self.llm_handler.generate_summary(text_content, refresh=refresh)
+
+        speech_start = self.SUMMARY_SHARE
+        progress_callback(speech_start, "Converting to speech...")
+        with self.telemetry.span("speech"):
+            audio_file = self.tts_handler.generate_speech(
+                summary,
+                progress_callback=lambda progress, message: progress_callback(
+                    speech_start + progress * self.SPEECH_SHARE, message
+                ),
+                workspace=workspace
+            )
+
+        cached = self.video_generator.cached_video([summary], [audio_file])
+        if cached:
+            progress_callback(1.0, "Done")
+            return {**cached, "summary": summary}
+
+        video_start = self.SUMMARY_SHARE + self.SPEECH_SHARE
+        with self.telemetry.span("video"):
+            video_path = self.video_generator.create_video(
+                summary, audio_file, workspace=workspace,
+                progress_callback=lambda progress, message: progress_callback(
+                    video_start + progress * (1 - video_start), message
+                )
+            )
+        return {"video_path": video_path, "video_url": None, "summary": summary}
+
+
+class StreamingVideoPipeline(VideoPipeline):
+    """Overlapped stages: speech starts on the summary's first sentences, frames on the first audio
+
+    Summary tokens, speech chunks and frames flow through bounded queues, so the job takes
+    about as long as its slowest stage instead of the sum of all of them.
+    """
+
+    name = "streaming"
+
+    EXPECTED_SUMMARY_WORDS = 375  # About the 500-token summary limit, for progress estimates
+
+    def __init__(self, llm_handler=None, tts_handler=None, video_generator=None,
+                 first_chunk_chars=150, chunk_chars=500):
+        super().__init__(llm_handler, tts_handler, video_generator)
+        self.first_chunk_chars = first_chunk_chars
+        self.chunk_chars = chunk_chars
+
+    def run(self, text_content, workspace, progress_callback, summary=None, refresh=False):
+        pieces = None
+        if summary is None:
+            progress_callback(0.0, "Generating summary...")
+            pieces = self.llm_handler.stream_summary(text_content, refresh=refresh)
+            summary = pieces.cached_text()
+        if summary is not None:
+            # An approved draft or a repeat: the speech comes from the TTS cache (chunked the same
+            # way as when the summary streamed), so settle it first and look for a finished video
+            chunks = list(self.tts_handler.stream_speech(
+                sentence_chunks([summary], self.first_chunk_chars, self.chunk_chars), workspace
+            ))
+            cached = self.video_generator.cached_video(
+                [text for text, _, _ in chunks], [audio_path for _, audio_path, _ in chunks]
+            )
+            if cached:
+                progress_callback(1.0, "Done")
+                return {**cached, "summary": summary}
+            speech = iter(chunks)
+        else:
+            speech = self.tts_handler.stream_speech(
+                sentence_chunks(pieces, self.first_chunk_chars, self.chunk_chars), workspace
+            )
+        video_path = self.video_generator.create_video_from_chunks(
+            speech, workspace=workspace, progress_callback=progress_callback,
+            expected_words=len(summary.split()) if summary else self.EXPECTED_SUMMARY_WORDS
+        )
+        return {"video_path": video_path, "video_url": None, "summary": summary if summary is not None else pieces.text}
+
+
+def make_pipeline(profile="full"):
+    """Streaming pipeline when the renderer can encode frames as they come, else the staged one"""
+    video_generator = VideoGenerator(profile)
+    if os.getenv("GENZIFY_PIPELINE", "streaming") == "streaming" and video_generator.supports_streaming():
+        return StreamingVideoPipeline(video_generator=video_generator)
+    return VideoPipeline(video_generator=video_generator)
+
+
+def run_video_job(job_id, payload, report):
+    """Job queue handler: render the video for one queued document
+
+    payload has the document "text" or an already approved "summary", the render "profile"
+    ("draft" or "full") and "refresh" to ask for a new summary instead of the cached one.
+    """
+    # Fresh handlers per job: the generators keep per-run state
+    workspace = JobWorkspace(job_id)
+    profile = payload.get("profile", "full")
+    try:
+        pipeline = make_pipeline(profile)
+        with get_telemetry().span("pipeline", pipeline=pipeline.name, profile=profile).set(job_id=job_id):
+            result = pipeline.run(
+                payload.get("text"), workspace, report,
+                summary=payload.get("summary"), refresh=payload.get("refresh", False)
+            )
+        logging.info(f"Job {job_id} produced {result['video_path'] or result['video_url']}")
+        result["profile"] = profile
+        return result
+    finally:
+        workspace.cleanup()
+
+
+def run_share_job(job_id, payload, report):
+    """Job queue handler: upload a finished video and remember its storage URL
+
+    payload has the cached "video_path" and a "pinned_path" the submitter linked into the
+    workspace named "workspace", so the cache can evict its entry while the upload runs.
+    """
+    workspace = JobWorkspace(payload["workspace"])
+    try:
+        report(0.0, "Uploading a shareable copy...")
+        url = get_storage_manager().upload_video(payload["pinned_path"], keep_local=True)
+        video_cache = get_video_cache()
+        if video_cache:
+            video_cache.set_url(payload["video_path"], url)
+        return {"video_url": url}
+    finally:
+        workspace.cleanup()
@@ -0,0 +1,230 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from utils import process_singleton
+
+
+class _InflightStream:
+    """Text pieces of one upstream stream, replayed to identical requests that join it"""
+
+    def __init__(self):
+        self.pieces = []
+        self.done = False
+        self.error = None
+        self._condition = threading.Condition()
+
+    def append(self, piece):
+        with self._condition:
+            self.pieces.append(piece)
+            self._condition.notify_all()
+
+    def finish(self, error=None):
+        with self._condition:
+            self.done = True
+            self.error = error
+            self._condition.notify_all()
+
+    def replay(self, timeout=None):
+        """Yield every piece from the start, waiting up to timeout seconds for each new one"""
+        index = 0
+        while True:
+            with self._condition:
+                while index >= len(self.pieces) and not self.done:
+                    if not self._condition.wait(timeout):
+                        raise Exception("Request timed out. Please try again.")
+                if index < len(self.pieces):
+                    piece = self.pieces[index]
+                    index += 1
+                elif self.error is not None:
+                    raise self.error
+                else:
+                    return
+            yield piece
+
+
+class ResponseCache:
+    """LLM responses by request hash: memory LRU in front of SQLite, with TTL and in-flight coalescing"""
+
+    def __init__(self, db_path, ttl=24 * 3600, max_memory_entries=256, max_disk_entries=10000):
+        self.ttl = ttl
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self._memory = OrderedDict()  # key -> (expires_at, value)
+        self._inflight = {}  # key -> Future or _InflightStream shared by identical concurrent requests
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "memory_hits": 0, "disk_hits": 0, "misses": 0, "coalesced": 0}
+
+        self._db_lock = threading.Lock()
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._db.commit()
+
+    @staticmethod
+    def key(model, messages, max_tokens, temperature):
+        """Hash of everything that shapes a completion (the system prompt is part of messages)"""
+        payload = json.dumps([model, messages, max_tokens, temperature], sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._memory.move_to_end(key)
+                    self._counters["hits"] += 1
+                    self._counters["memory_hits"] += 1
+                    return entry[1]
+                del self._memory[key]
+
+        with self._db_lock:
+            row = self._db.execute("SELECT value, expires_at FROM responses WHERE key = ?", (key,)).fetchone()
+            if row and row[1] <= now:
+                self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._db.commit()
+                row = None
+            elif row:
+                self._db.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+                self._db.commit()
+
+        if row is None:
+            return None
+        with self._lock:
+            self._counters["hits"] += 1
+            self._counters["disk_hits"] += 1
+        self._remember(key, row[1], row[0])
+        return row[0]
+
+    def put(self, key, value):
+        now = time.time()
+        expires_at = now + self.ttl
+        self._remember(key, expires_at, value)
+        with self._db_lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses (key, value, expires_at, last_used) VALUES (?, ?, ?, ?)",
+                (key, value, expires_at, now)
+            )
+            # Drop expired rows, then the least recently used ones beyond the cap
+            self._db.execute("DELETE FROM responses WHERE expires_at <= ?", (now,))
+            self._db.execute(
+                "DELETE FROM responses WHERE key IN ("
+                "SELECT key FROM responses ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.max_disk_entries,)
+            )
+            self._db.commit()
+
+    def get_or_compute(self, key, compute):
+        """Cached value, or compute it once even when identical requests arrive together"""
+        value = self.get(key)
+        if value is not None:
+            return value
+
+        with self._lock:
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._inflight[key] = future
+                self._counters["misses"] += 1
+            else:
+                self._counters["coalesced"] += 1
+
+        if not owner:
+            if isinstance(future, _InflightStream):
+                return "".join(future.replay())
+            return future.result()
+
+        try:
+            value = compute()
+            self.put(key, value)
+            future.set_result(value)
+            return value
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def stream(self, key, open_stream, timeout=None):
+        """Yield text pieces for key with at most one upstream stream per key at a time
+
+        The first caller runs open_stream() (an iterable of text pieces) and caches the whole
+        text when it ends. Identical callers meanwhile replay its pieces from the start, or wait
+        for an identical get_or_compute(). timeout bounds each wait for the next piece. The
+        caller checks the cache first.
+        """
+        with self._lock:
+            entry = self._inflight.get(key)
+            owner = entry is None
+            if owner:
+                entry = _InflightStream()
+                self._inflight[key] = entry
+                self._counters["misses"] += 1
+            else:
+                self._counters["coalesced"] += 1
+
+        if not owner:
+            if isinstance(entry, _InflightStream):
+                yield from entry.replay(timeout)
+                return
+            try:
+                yield entry.result(timeout)
+            except FutureTimeout:
+                raise Exception("Request timed out. Please try again.")
+            return
+
+        try:
+            for piece in open_stream():
+                entry.append(piece)
+                yield piece
+            self.put(key, "".join(entry.pieces))
+            entry.finish()
+        except Exception as e:
+            entry.finish(e)
+            raise
+        except GeneratorExit:
+            # The owner stopped reading, which closed the upstream stream
+            entry.finish(Exception("The identical request was cancelled"))
+            raise
+        finally:
+            with self._lock:
+                if self._inflight.get(key) is entry:
+                    del self._inflight[key]
+
+    def stats(self):
+        """Hit, miss and coalescing counters plus current sizes, for sizing the cache"""
+        with self._lock:
+            stats = dict(self._counters)
+            stats["memory_entries"] = len(self._memory)
+        with self._db_lock:
+            stats["disk_entries"] = self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        lookups = stats["hits"] + stats["misses"] + stats["coalesced"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+    def _remember(self, key, expires_at, value):
+        with self._lock:
+            self._memory[key] = (expires_at, value)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_memory_entries:
+                self._memory.popitem(last=False)
+
+
+@process_singleton
+def get_response_cache():
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    try:
+        return ResponseCache(os.path.join(base_dir, "llm_cache.sqlite3"))
+    except sqlite3.Error as e:
+        logging.warning(f"LLM response cache on disk unavailable, using memory only: {str(e)}")
+        return ResponseCache(":memory:")
@@ -0,0 +1,112 @@
+import re
+import hashlib
+import threading
+import numpy as np
+from collections import OrderedDict
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def estimate_tokens(text):
+    """Rough LLM token count (about four characters per token for English)"""
+    return len(text) // 4 + 1
+
+
+def _tokenize(text):
+    return _TOKEN_RE.findall(text.lower())
+
+
+class RetrievalIndex:
+    """BM25 index over overlapping word-window passages of one document"""
+
+    def __init__(self, text, passage_words=200, overlap_words=50, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+
+        # Overlapping passages so an answer straddling a boundary still lands in one of them
+        words = text.split()
+        step = max(1, passage_words - overlap_words)
+        self.passages = [
+            " ".join(words[start:start + passage_words])
+            for start in range(0, max(len(words) - overlap_words, 1), step)
+        ]
+
+        self.vocab = {}
+        term_ids = []
+        doc_ids = []
+        for doc, passage in enumerate(self.passages):
+            ids = [self.vocab.setdefault(token, len(self.vocab)) for token in _tokenize(passage)]
+            term_ids.extend(ids)
+            doc_ids.extend([doc] * len(ids))
+
+        n_docs = len(self.passages)
+        terms = np.asarray(term_ids, dtype=np.int64)
+        docs = np.asarray(doc_ids, dtype=np.int64)
+        self.doc_len = np.bincount(docs, minlength=n_docs).astype(np.float64)
+        self.avgdl = max(self.doc_len.mean(), 1.0)
+
+        # Postings sorted by term then passage, with term frequencies
+        keys, counts = np.unique(terms * n_docs + docs, return_counts=True)
+        self.post_docs = keys % n_docs
+        self.post_tf = counts.astype(np.float64)
+        post_terms = keys // n_docs
+        self.term_starts = np.searchsorted(post_terms, np.arange(len(self.vocab) + 1))
+
+        df = np.diff(self.term_starts)
+        self.idf = np.log(1.0 + (n_docs - df + 0.5) / (df + 0.5))
+
+    def scores(self, query):
+        """BM25 score of every passage for the query"""
+        scores = np.zeros(len(self.passages))
+        term_ids = {self.vocab[token] for token in _tokenize(query) if token in self.vocab}
+        if not term_ids:
+            return scores
+
+        slices = [np.arange(self.term_starts[t], self.term_starts[t + 1]) for t in term_ids]
+        postings = np.concatenate(slices)
+        idf = np.concatenate([np.full(len(s), self.idf[t]) for s, t in zip(slices, term_ids)])
+
+        docs = self.post_docs[postings]
+        tf = self.post_tf[postings]
+        norm = self.k1 * (1 - self.b + self.b * self.doc_len[docs] / self.avgdl)
+        np.add.at(scores, docs, idf * tf * (self.k1 + 1) / (tf + norm))
+        return scores
+
+    def build_context(self, query, token_budget, top_k=8):
+        """Best passages for the query within the token budget, in document order"""
+        scores = self.scores(query)
+        ranked = np.argsort(-scores, kind="stable")[:top_k]
+
+        chosen = []
+        used = 0
+        for doc in ranked:
+            cost = estimate_tokens(self.passages[doc])
+            if used + cost > token_budget:
+                continue
+            chosen.append(int(doc))
+            used += cost
+
+        return "\n\n".join(self.passages[doc] for doc in sorted(chosen))
+
+
+# Indexes by document hash, shared across sessions asking about the same notes
+_indexes = OrderedDict()
+_indexes_lock = threading.Lock()
+_MAX_INDEXES = 16
+
+
+def get_index(text):
+    """Build the index for a document once and reuse it for every later question"""
+    digest = hashlib.sha256(text.encode('utf-8')).hexdigest()
+    with _indexes_lock:
+        index = _indexes.get(digest)
+        if index is not None:
+            _indexes.move_to_end(digest)
+            return index
+
+    index = RetrievalIndex(text)
+    with _indexes_lock:
+        _indexes[digest] = index
+        while len(_indexes) > _MAX_INDEXES:
+            _indexes.popitem(last=False)
+    return index
@@ -1,35 +1,229 @@
-from supabase import create_client
-from utils import get_env_variable
+from utils import get_env_variable, process_singleton
+from concurrent.futures import ThreadPoolExecutor, Future
 import os
+import time
+import base64
+import random
 import logging
+import threading
+import requests
+from telemetry import get_telemetry
+from disk_cache import file_digest
+
+
+class SupabaseBucket:
+    """Supabase Storage bucket over its REST API, including the resumable (TUS) endpoint"""
+
+    def __init__(self, url, key, bucket_name, timeout=60):
+        self.url = url.rstrip('/')
+        self.bucket_name = bucket_name
+        self.timeout = timeout
+        self.session = requests.Session()  # Keeps one connection alive across parts
+        self.session.headers.update({"Authorization": f"Bearer {key}", "apikey": key})
+
+    def exists(self, name):
+        response = self.session.post(
+            f"{self.url}/storage/v1/object/list/{self.bucket_name}",
+            json={"prefix": "", "search": name, "limit": 100, "offset": 0},
+            timeout=self.timeout
+        )
+        response.raise_for_status()
+        return any(item.get("name") == name for item in response.json())
+
+    def upload(self, name, path, content_type):
+        """Upload a small file in a single request"""
+        with open(path, 'rb') as f:
+            response = self.session.post(
+                f"{self.url}/storage/v1/object/{self.bucket_name}/{name}",
+                data=f,
+                headers={"Content-Type": content_type, "x-upsert": "true"},
+                timeout=self.timeout
+            )
+        response.raise_for_status()
+
+    def create_resumable(self, name, size, content_type):
+        """Open a resumable upload and return its URL"""
+        metadata = {"bucketName": self.bucket_name, "objectName": name, "contentType": content_type}
+        response = self.session.post(
+            f"{self.url}/storage/v1/upload/resumable",
+            headers={
+                "Tus-Resumable": "1.0.0",
+                "Upload-Length": str(size),
+                "Upload-Metadata": ",".join(
+                    f"{field} {base64.b64encode(value.encode('utf-8')).decode('ascii')}"
+                    for field, value in metadata.items()
+                ),
+                "x-upsert": "true",
+            },
+            timeout=self.timeout
+        )
+        response.raise_for_status()
+        return requests.compat.urljoin(f"{self.url}/", response.headers["Location"])
+
+    def resumable_offset(self, upload_url):
+        """Bytes the server already holds for a resumable upload"""
+        response = self.session.head(upload_url, headers={"Tus-Resumable": "1.0.0"}, timeout=self.timeout)
+        response.raise_for_status()
+        return int(response.headers["Upload-Offset"])
+
+    def upload_part(self, upload_url, offset, data):
+        """Append one part at offset and return the new offset"""
+        response = self.session.patch(
+            upload_url,
+            data=data,
+            headers={
+                "Tus-Resumable": "1.0.0",
+                "Upload-Offset": str(offset),
+                "Content-Type": "application/offset+octet-stream",
+            },
+            timeout=self.timeout
+        )
+        response.raise_for_status()
+        return int(response.headers["Upload-Offset"])
+
+    def public_url(self, name):
+        return f"{self.url}/storage/v1/object/public/{self.bucket_name}/{name}"
+
+
+def _is_retryable(error):
+    """Network failures, 408/409/429 and 5xx may succeed later; other HTTP errors will not"""
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        status = error.response.status_code
+        return status in (408, 409, 429) or status >= 500
+    return isinstance(error, requests.RequestException)
+
 
 class StorageManager:
-    def __init__(self):
-        self.url = get_env_variable("SUPABASE_URL")
-        self.key = get_env_variable("SUPABASE_KEY")
-        self.supabase = create_client(self.url, self.key)
+    def __init__(self, bucket=None, chunk_size=6 * 1024 * 1024, max_retries=5, max_workers=2):
         self.bucket_name = 'videos'
-    
-    def upload_video(self, video_path):
+        if bucket is None:
+            self.url = get_env_variable("SUPABASE_URL")
+            self.key = get_env_variable("SUPABASE_KEY")
+            bucket = SupabaseBucket(self.url, self.key, self.bucket_name)
+        self.bucket = bucket  # Anything with SupabaseBucket's methods, e.g. a local stand-in
+        self.chunk_size = chunk_size  # Supabase's resumable endpoint expects 6 MB parts
+        self.max_retries = max_retries
+        self.retry_delay = 0.5
+
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="upload")
+        self._lock = threading.Lock()
+        self._inflight = {}  # sha256 -> Future, so identical content uploads once
+        self._resume_urls = {}  # sha256 -> resumable upload URL, reused after a failed attempt
+        self.telemetry = get_telemetry()
+
+    def upload_video(self, video_path, keep_local=False):
+        """Upload a video and return its public URL, blocking until it is stored"""
+        return self.upload_video_async(video_path, keep_local).result()
+
+    def upload_video_async(self, video_path, keep_local=False):
+        """Upload a video on a background thread; returns a Future for its public URL"""
+        return self._pool.submit(self._upload_video, video_path, keep_local)
+
+    def _upload_video(self, video_path, keep_local):
         try:
-            # Upload to Supabase storage
-            with open(video_path, 'rb') as f:
-                file_name = os.path.basename(video_path)
-                self.supabase.storage.from_(self.bucket_name).upload(
-                    path=file_name,
-                    file=f,
-                    file_options={"content-type": "video/mp4"}
-                )
-            
-            # Get public URL
-            url = self.supabase.storage.from_(self.bucket_name).get_public_url(file_name)
-            
+            # Content-addressed name: the same video is stored once however often it is rendered
+            digest = file_digest(video_path)
+            file_name = f"{digest}.mp4"
+
+            with self._lock:
+                future = self._inflight.get(digest)
+                owner = future is None
+                if owner:
+                    future = Future()
+                    self._inflight[digest] = future
+
+            if owner:
+                try:
+                    self._store(digest, file_name, video_path)
+                    future.set_result(None)
+                except Exception as e:
+                    future.set_exception(e)
+                    raise
+                finally:
+                    with self._lock:
+                        self._inflight.pop(digest, None)
+            else:
+                future.result()
+
+            url = self.bucket.public_url(file_name)
+
             # Clean up local file
-            os.remove(video_path)
-            logging.info(f"Successfully uploaded video: {file_name}")
-            
+            if not keep_local:
+                os.remove(video_path)
+
             return url
-            
+
         except Exception as e:
             logging.error(f"Error uploading video: {str(e)}")
             raise Exception(f"Error uploading video: {str(e)}")
+
+    def _store(self, digest, file_name, video_path):
+        if self._with_retries(lambda: self.bucket.exists(file_name)):
+            logging.info(f"Video already stored, skipping upload: {file_name}")
+            self.telemetry.count("uploads_total", result="deduplicated")
+            return
+
+        size = os.path.getsize(video_path)
+        with self.telemetry.span("upload", method="single" if size <= self.chunk_size else "resumable").set(bytes=size):
+            if size <= self.chunk_size:
+                self._with_retries(lambda: self.bucket.upload(file_name, video_path, "video/mp4"))
+            else:
+                self._upload_resumable(digest, file_name, video_path, size)
+        self.telemetry.count("uploads_total", result="stored")
+        self.telemetry.count("upload_bytes_total", size)
+
+        with self._lock:
+            self._resume_urls.pop(digest, None)
+        logging.info(f"Successfully uploaded video: {file_name}")
+
+    def _upload_resumable(self, digest, file_name, video_path, size):
+        """Send the file in chunk_size parts, resuming from the server's offset after a failure"""
+        with self._lock:
+            upload_url = self._resume_urls.get(digest)
+        offset = 0
+        if upload_url:
+            try:
+                offset = self.bucket.resumable_offset(upload_url)
+                logging.info(f"Resuming upload of {file_name} at byte {offset}")
+            except Exception:
+                upload_url = None  # Expired or unknown: start over
+        if not upload_url:
+            upload_url = self._with_retries(lambda: self.bucket.create_resumable(file_name, size, "video/mp4"))
+            with self._lock:
+                self._resume_urls[digest] = upload_url
+
+        failures = 0
+        with open(video_path, 'rb') as f:
+            while offset < size:
+                f.seek(offset)
+                data = f.read(self.chunk_size)
+                try:
+                    offset = self.bucket.upload_part(upload_url, offset, data)
+                    failures = 0
+                except Exception as e:
+                    failures += 1
+                    if not _is_retryable(e) or failures > self.max_retries:
+                        raise
+                    self._backoff(failures, e)
+                    # Ask the server how much arrived rather than guessing
+                    offset = self._with_retries(lambda: self.bucket.resumable_offset(upload_url))
+
+    def _with_retries(self, request):
+        for attempt in range(1, self.max_retries + 2):
+            try:
+                return request()
+            except Exception as e:
+                if not _is_retryable(e) or attempt > self.max_retries:
+                    raise
+                self._backoff(attempt, e)
+
+    def _backoff(self, attempt, error):
+        delay = random.uniform(0, min(30.0, self.retry_delay * 2 ** attempt))
+        logging.warning(f"Upload request failed ({str(error)}), retrying in {delay:.2f}s")
+        time.sleep(delay)
+
+
+@process_singleton
+def get_storage_manager():
+    """The manager every session and upload job shares, so identical uploads coalesce"""
+    return StorageManager()
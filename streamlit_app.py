@@ -1,23 +1,36 @@
 import streamlit as st
-from pdf_processor import PDFProcessor
-from video_generator import VideoGenerator
-from llm_handler import LLMHandler
-from tts_handler import TTSHandler
-from storage_manager import StorageManager
+import utils  # Loads .env before any service reads its settings
 import os
+import time
+import uuid
 import logging
 
+# Services are created once per process, on first use, and shared by every session and rerun.
+# Their modules are imported inside so the page draws before PDF, LLM and storage libraries load.
+# The video cache and job queue are process singletons already, so the properties below call
+# their getters directly rather than caching them a second time.
+
+@st.cache_resource
+def get_pdf_processor():
+    from pdf_processor import PDFProcessor
+    return PDFProcessor()
+
+@st.cache_resource
+def get_llm_handler():
+    from llm_handler import LLMHandler
+    return LLMHandler()
+
 class EducationalContentApp:
     def __init__(self):
-        self.pdf_processor = PDFProcessor()
-        self.video_generator = VideoGenerator()
-        self.llm_handler = LLMHandler()
-        self.tts_handler = TTSHandler()
-        self.storage = StorageManager()
-        
         # Initialize session state
         if 'text_content' not in st.session_state:
             st.session_state.text_content = None
+        if 'user_id' not in st.session_state:
+            st.session_state.user_id = uuid.uuid4().hex  # Per-session identity for job limits
+        if 'video_job_id' not in st.session_state:
+            st.session_state.video_job_id = None
+        if 'video_uploads' not in st.session_state:
+            st.session_state.video_uploads = {}  # video job id -> id of the job uploading it, or None
     
     def main(self):
         st.set_page_config(page_title="GenZify", page_icon="🚽", layout="wide")
@@ -103,69 +116,192 @@ class EducationalContentApp:
                     normal_answer = st.button("🤖 Answer", key="answer_button")
                     
                     if normal_answer:
-                        with st.spinner("Generating answer..."):
-                            try:
-                                answer = self.llm_handler.generate_answer(
-                                    question, 
-                                    st.session_state.text_content, 
-                                    genzify=False
-                                )
-                                st.markdown(
-                                    f'''
-                                    <div class="answer-container">
-                                        💡 Question: {question}
-                                        <br><br>
-                                        {answer}
-                                    </div>
-                                    ''', 
-                                    unsafe_allow_html=True
-                                )
-                            except Exception as e:
-                                st.error(f"Error generating answer: {str(e)}")
+                        try:
+                            self._stream_answer(question, genzify=False, icon="💡")
+                        except Exception as e:
+                            st.error(f"Error generating answer: {str(e)}")
                 
                 with col2:
                     genzify_answer = st.button("🚽 Genzify!", key="genzify_button")
                     
                     if genzify_answer:
-                        with st.spinner("Generating Gen Z style answer..."):
-                            try:
-                                answer = self.llm_handler.generate_answer(
-                                    question, 
-                                    st.session_state.text_content, 
-                                    genzify=True
-                                )
-                                st.markdown(
-                                    f'''
-                                    <div class="answer-container">
-                                        🔥 Question: {question}
-                                        <br><br>
-                                        {answer}
-                                    </div>
-                                    ''', 
-                                    unsafe_allow_html=True
-                                )
-                            except Exception as e:
-                                st.error(f"Error generating answer: {str(e)}")
+                        try:
+                            self._stream_answer(question, genzify=True, icon="🔥")
+                        except Exception as e:
+                            st.error(f"Error generating answer: {str(e)}")
             
-            # Video generation
+            # Video generation is queued; this session only polls the job's status.
+            # A quick low-resolution draft comes first; the full render waits for the user's go-ahead.
             if st.button("🚽 PDF to Brainrot", key="video_button"):
-                try:
-                    with st.spinner("Generating summary..."):
-                        summary = self.llm_handler.generate_summary(st.session_state.text_content)
-                    
-                    with st.spinner("Converting to speech..."):
-                        audio_file = self.tts_handler.generate_speech(summary)
-                    
-                    with st.spinner("Creating video..."):
-                        video_file = self.video_generator.create_video(summary, audio_file)
-                    
-                    if os.path.exists(video_file):
-                        st.success("🎥 Your video is ready!")
-                        with open(video_file, 'rb') as video_bytes:
-                            st.video(video_bytes.read())
-                        
-                except Exception as e:
-                    st.error(f"Error generating video: {str(e)}")
+                profile = "draft" if os.getenv("GENZIFY_DRAFT_PREVIEW", "1") == "1" else "full"
+                self._submit_video({"text": st.session_state.text_content, "profile": profile})
+            
+            if st.session_state.video_job_id:
+                self._show_video_job(st.session_state.video_job_id)
+
+    @property
+    def pdf_processor(self):
+        return get_pdf_processor()
+
+    @property
+    def llm_handler(self):
+        return get_llm_handler()
+
+    @property
+    def video_cache(self):
+        from video_cache import get_video_cache
+        return get_video_cache()
+
+    @property
+    def job_queue(self):
+        # Videos render on shared background workers; the media stack loads with the first job
+        from job_queue import get_job_queue
+        return get_job_queue()
+
+    def _submit_video(self, payload):
+        try:
+            st.session_state.video_job_id = self.job_queue.submit(st.session_state.user_id, payload)
+            return True
+        except Exception as e:
+            st.error(f"Error generating video: {str(e)}")
+            return False
+
+    def _show_video_job(self, job_id):
+        """Show a queued job's status, rerunning the script until it finishes"""
+        job = self.job_queue.get(job_id)
+        if job is None:
+            st.session_state.video_job_id = None
+            return
+        
+        waiting = job["status"] in ("queued", "running")
+        if job["status"] == "queued":
+            ahead = job["position"]
+            st.info(f"⏳ Waiting in queue ({ahead} video(s) ahead of yours)..." if ahead else "⏳ Starting soon...")
+        elif job["status"] == "running":
+            st.progress(job["progress"], text=f"Progress: {int(job['progress'] * 100)}% - {job['message']}")
+        elif job["status"] == "done":
+            video_file = job["result"]["video_path"]
+            video_url = job["result"].get("video_url")
+            if video_file and os.path.exists(video_file):
+                if job["result"].get("profile") == "draft":
+                    self._show_draft(job["result"])
+                else:
+                    st.success("🎥 Your video is ready!")
+                    with open(video_file, 'rb') as video_bytes:
+                        st.video(video_bytes.read())
+                    waiting = self._share_video(job_id, video_file)
+            elif video_url:
+                # Made before and since evicted from the local video cache, but still in storage
+                st.success("🎥 Your video is ready!")
+                st.video(video_url)
+                st.markdown(f"🔗 [Shareable link]({video_url})")
+            else:
+                st.warning("This video is no longer available. Please generate it again.")
+        else:
+            st.error(f"Error generating video: {job['error']}")
+        
+        if waiting:
+            # Poll instead of blocking; any widget interaction interrupts the wait
+            time.sleep(1)
+            st.rerun()
+
+    def _show_draft(self, result):
+        """Preview a draft render and let the user confirm it or ask for another summary"""
+        st.info("👀 Quick low-res preview. Like it? Render it in full quality.")
+        with open(result["video_path"], 'rb') as video_bytes:
+            st.video(video_bytes.read())
+        with st.expander("📝 Summary"):
+            st.write(result["summary"])
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            # Same summary, and the same speech from the TTS cache: only the render is redone
+            confirm = st.button("✅ Render full quality", key="confirm_video_button")
+        with col2:
+            regenerate = st.button("🔄 Try another summary", key="regenerate_video_button")
+        
+        submitted = False
+        if confirm:
+            submitted = self._submit_video({"summary": result["summary"], "profile": "full"})
+        elif regenerate:
+            submitted = self._submit_video(
+                {"text": st.session_state.text_content, "profile": "draft", "refresh": True}
+            )
+        if submitted:
+            st.rerun()  # The preview stays in the video cache until its quota evicts it
+
+    def _share_video(self, job_id, video_file):
+        """Upload the shown video on the job queue and link it once stored; True while uploading"""
+        video_cache = self.video_cache
+        known_url = video_cache.url(video_file) if video_cache else None
+        if known_url:
+            # Uploaded before, by this or another session
+            st.markdown(f"🔗 [Shareable link]({known_url})")
+            return False
+        
+        uploads = st.session_state.video_uploads
+        if job_id not in uploads:
+            uploads[job_id] = self._submit_upload(video_file)
+        upload = self.job_queue.get(uploads[job_id]) if uploads[job_id] else None
+        if upload is None:
+            return False
+        
+        if upload["status"] in ("queued", "running"):
+            st.caption("☁️ Uploading a shareable copy...")
+            return True
+        if upload["status"] == "done":
+            st.markdown(f"🔗 [Shareable link]({upload['result']['video_url']})")
+        else:
+            st.caption(f"Could not upload the video: {upload['error']}")
+        return False
+
+    def _submit_upload(self, video_file):
+        """Queue an upload of a cached video and return the job id, or None"""
+        from job_workspace import JobWorkspace
+        # Pinned into its own workspace now: the cache may evict the entry before the upload ends
+        workspace = JobWorkspace()
+        try:
+            payload = {
+                "kind": "share",
+                "video_path": video_file,
+                "pinned_path": workspace.link(video_file, "video.mp4"),
+                "workspace": workspace.id,
+            }
+            # Counted apart from renders, so an upload never holds up the user's next video
+            return self.job_queue.submit(f"{st.session_state.user_id}:share", payload)
+        except Exception as e:
+            workspace.cleanup()
+            logging.warning(f"Video upload unavailable: {str(e)}")
+            return None
+
+    def _stream_answer(self, question, genzify, icon):
+        """Render the answer incrementally as tokens arrive"""
+        placeholder = st.empty()
+        stream = self.llm_handler.stream_answer(question, st.session_state.text_content, genzify=genzify)
+        
+        answer = ""
+        last_render = 0
+        for piece in stream:
+            answer += piece
+            # Batch tokens into a few redraws per second instead of one message per token
+            if time.time() - last_render >= 0.05:
+                self._render_answer(placeholder, question, answer, icon)
+                last_render = time.time()
+        self._render_answer(placeholder, question, answer, icon)
+        
+        st.caption(f"First token in {stream.time_to_first_token or 0:.2f}s · complete in {stream.total_time:.2f}s")
+
+    def _render_answer(self, placeholder, question, answer, icon):
+        placeholder.markdown(
+            f'''
+            <div class="answer-container">
+                {icon} Question: {question}
+                <br><br>
+                {answer}
+            </div>
+            ''', 
+            unsafe_allow_html=True
+        )
 
 if __name__ == "__main__":
     app = EducationalContentApp()
@@ -0,0 +1,103 @@
+import os
+import subprocess
+import tempfile
+
+
+class SubtitleRenderer:
+    """Burns the caption timeline onto the background in one native ffmpeg pass"""
+
+    def __init__(self, width, height, fps, font_name="Arial", font_size=120, outline_width=4):
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.font_name = font_name
+        self.font_size = font_size
+        self.outline_width = outline_width
+
+    def write_script(self, events, script_path):
+        """Write (start_frame, end_frame, text) events as an ASS subtitle file"""
+        lines = [
+            "[Script Info]",
+            "ScriptType: v4.00+",
+            f"PlayResX: {self.width}",
+            f"PlayResY: {self.height}",
+            "WrapStyle: 2",
+            "ScaledBorderAndShadow: yes",
+            "",
+            "[V4+ Styles]",
+            "Format: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, OutlineColour, BackColour, "
+            "Bold, Italic, Underline, StrikeOut, ScaleX, ScaleY, Spacing, Angle, BorderStyle, Outline, Shadow, "
+            "Alignment, MarginL, MarginR, MarginV, Encoding",
+            # White text, black outline, no shadow, centered on the frame (alignment 5)
+            f"Style: Default,{self.font_name},{self.font_size},&H00FFFFFF,&H00FFFFFF,&H00000000,&H00000000,"
+            f"0,0,0,0,100,100,0,0,1,{self.outline_width},0,5,0,0,0,1",
+            "",
+            "[Events]",
+            "Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text",
+        ]
+        for start_frame, end_frame, text in events:
+            start = self._timestamp(start_frame)
+            end = self._timestamp(end_frame)
+            lines.append(f"Dialogue: 0,{start},{end},Default,,0,0,0,,{self._escape(text)}")
+
+        with open(script_path, 'w', encoding='utf-8') as f:
+            f.write("\n".join(lines) + "\n")
+        return script_path
+
+    def render(self, background_path, audio_path, script_path, output_path, total_frames,
+               prescaled=False, on_frame=None, video_args=None):
+        """Loop the background, burn in the subtitles and mux the audio into the final file"""
+        if video_args is None:
+            video_args = ["-c:v", "libx264", "-preset", "fast"]
+        video_filter = ""
+        if not prescaled:
+            video_filter = (
+                f"scale={self.width}:{self.height}:force_original_aspect_ratio=increase:flags=bilinear,"
+                f"crop={self.width}:{self.height},"
+                f"setpts=PTS-STARTPTS,fps={self.fps},"
+            )
+        # ffmpeg runs from the script's directory so the filter only sees a plain file name
+        video_filter += f"setsar=1,ass={os.path.basename(script_path)}"
+
+        cmd = [
+            "ffmpeg", "-y", "-v", "error", "-nostats", "-progress", "pipe:1",
+            "-stream_loop", "-1", "-i", os.path.abspath(background_path),
+            "-i", os.path.abspath(audio_path),
+            "-map", "0:v", "-map", "1:a",
+            "-vf", video_filter,
+            "-frames:v", str(total_frames),
+        ] + video_args + [
+            "-pix_fmt", "yuv420p",  # Ensure pixel format is compatible
+            "-c:a", "aac", "-b:a", "192k",
+            "-shortest",
+            "-movflags", "+faststart",
+            os.path.abspath(output_path),
+        ]
+
+        with tempfile.TemporaryFile() as log:
+            process = subprocess.Popen(
+                cmd, cwd=os.path.dirname(os.path.abspath(script_path)),
+                stdout=subprocess.PIPE, stderr=log, text=True
+            )
+            for line in process.stdout:
+                if on_frame and line.startswith("frame="):
+                    on_frame(int(line.split("=", 1)[1]))
+            result = process.wait()
+
+            if result != 0 or not os.path.exists(output_path):
+                log.seek(0)
+                raise Exception(f"Failed to burn subtitles: {log.read().decode(errors='replace').strip()}")
+        return output_path
+
+    def _timestamp(self, frame_index):
+        """ASS time (centisecond resolution) for a frame boundary"""
+        centiseconds = round(frame_index * 100 / self.fps)
+        hours, centiseconds = divmod(centiseconds, 360000)
+        minutes, centiseconds = divmod(centiseconds, 6000)
+        seconds, centiseconds = divmod(centiseconds, 100)
+        return f"{hours}:{minutes:02d}:{seconds:02d}.{centiseconds:02d}"
+
+    def _escape(self, text):
+        # Braces would start override blocks. A backslash followed by n, N, h or a brace is an
+        # escape sequence; a zero-width joiner after each one keeps it a literal backslash.
+        return text.replace('\\', '\\\u200d').replace('{', '\\{').replace('}', '\\}')
@@ -0,0 +1,295 @@
+import os
+import json
+import time
+import bisect
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from utils import process_singleton
+
+# Seconds; spans range from a cached lookup to a full render
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+span_logger = logging.getLogger("genzify.telemetry")
+
+
+class Histogram:
+    """Bucketed distribution of observed values, as Prometheus expects"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # Last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-th quantile (None if empty or beyond the last bucket)"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return None
+
+
+class Span:
+    """Times a block of work; the duration is recorded when the block exits"""
+
+    def __init__(self, telemetry, name, labels):
+        self.telemetry = telemetry
+        self.name = name
+        self.labels = labels  # Metric labels: keep them low-cardinality
+        self.attributes = {}  # Logged with the span only, e.g. sizes or ids
+        self.parent = None
+        self.duration = None
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+        return self
+
+    def __enter__(self):
+        stack = self.telemetry._span_stack()
+        self.parent = stack[-1].name if stack else None
+        stack.append(self)
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.duration = time.perf_counter() - self._start
+        stack = self.telemetry._span_stack()
+        if self in stack:
+            stack.remove(self)  # Not always the top: a span inside a generator exits whenever it is closed
+        # A generator closed early is not a failure
+        self.telemetry._end_span(self, None if isinstance(exc, GeneratorExit) else exc)
+        return False
+
+
+class Telemetry:
+    """In-process spans, counters and histograms, exportable as Prometheus text or JSON"""
+
+    def __init__(self, prefix="genzify", log_spans=False):
+        self.prefix = prefix
+        self.log_spans = log_spans  # Emit one JSON log line per finished span
+        self._lock = threading.Lock()
+        self._counters = {}  # (name, labels) -> value
+        self._histograms = {}  # (name, labels) -> Histogram
+        self._local = threading.local()
+
+    def span(self, name, **labels):
+        """with telemetry.span("tts_chunk"): ... records span_seconds{span="tts_chunk"}"""
+        return Span(self, name, labels)
+
+    def count(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def snapshot(self):
+        """All metrics as plain data"""
+        with self._lock:
+            counters = [
+                {"name": name, "labels": dict(labels), "value": value}
+                for (name, labels), value in sorted(self._counters.items())
+            ]
+            histograms = [
+                {
+                    "name": name, "labels": dict(labels), "count": h.count, "sum": h.sum,
+                    "p50": h.quantile(0.5), "p95": h.quantile(0.95),
+                }
+                for (name, labels), h in sorted(self._histograms.items())
+            ]
+        return {"counters": counters, "histograms": histograms}
+
+    def to_json(self):
+        return json.dumps(self.snapshot())
+
+    def prometheus_text(self):
+        """Metrics in the Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            typed = set()
+            for (name, labels), value in sorted(self._counters.items()):
+                metric = f"{self.prefix}_{name}"
+                if metric not in typed:
+                    typed.add(metric)
+                    lines.append(f"# TYPE {metric} counter")
+                lines.append(f"{metric}{_format_labels(labels)} {value}")
+            for (name, labels), h in sorted(self._histograms.items()):
+                metric = f"{self.prefix}_{name}"
+                if metric not in typed:
+                    typed.add(metric)
+                    lines.append(f"# TYPE {metric} histogram")
+                cumulative = 0
+                bounds = [f"{bound:g}" for bound in h.buckets] + ["+Inf"]
+                for bound, count in zip(bounds, h.counts):
+                    cumulative += count
+                    lines.append(f"{metric}_bucket{_format_labels(labels + (('le', bound),))} {cumulative}")
+                lines.append(f"{metric}_sum{_format_labels(labels)} {h.sum}")
+                lines.append(f"{metric}_count{_format_labels(labels)} {h.count}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def _span_stack(self):
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        return self._local.stack
+
+    def _end_span(self, span, error):
+        self.observe("span_seconds", span.duration, span=span.name, **span.labels)
+        if error is not None:
+            self.count("span_errors_total", span=span.name, **span.labels)
+        if self.log_spans:
+            span_logger.info(json.dumps({
+                "span": span.name, "duration_s": round(span.duration, 6), "parent": span.parent,
+                "thread": threading.current_thread().name, "error": str(error) if error else None,
+                **span.labels, **span.attributes,
+            }, default=str))
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    escaped = (
+        (name, str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n"))
+        for name, value in labels
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+def serve_metrics(telemetry, port, host="127.0.0.1"):
+    """Serve /metrics (Prometheus) and /metrics.json from a daemon thread"""
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def do_GET(self):
+            if self.path == "/metrics":
+                body, content_type = telemetry.prometheus_text(), "text/plain; version=0.0.4"
+            elif self.path == "/metrics.json":
+                body, content_type = telemetry.to_json(), "application/json"
+            else:
+                self.send_error(404)
+                return
+            data = body.encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    logging.info(f"Serving metrics on http://{host}:{server.server_address[1]}/metrics")
+    return server
+
+
+class ProgressEvent:
+    """One progress update: progress in [0, 1] and a short description of the current step"""
+
+    def __init__(self, job_id, progress, message):
+        self.job_id = job_id
+        self.progress = progress
+        self.message = message
+        self.time = time.time()
+
+
+class ProgressBus:
+    """Fans job progress out to subscribers, rate-limited per job
+
+    An update whose message matches the last delivered one is dropped if it comes within
+    min_interval of it; a new message (the next step) and completion are always delivered.
+    """
+
+    def __init__(self, min_interval=0.5, telemetry=None):
+        self.min_interval = min_interval
+        self.telemetry = telemetry
+        self._lock = threading.Lock()
+        self._subscribers = []  # (callback, job_id or None for every job)
+        self._last = {}  # job_id -> (monotonic time, message) of the last delivered event
+
+    def subscribe(self, callback, job_id=None):
+        """Call callback(event) for one job's updates, or every job's; returns an unsubscribe function"""
+        entry = (callback, job_id)
+        with self._lock:
+            self._subscribers.append(entry)
+
+        def unsubscribe():
+            with self._lock:
+                if entry in self._subscribers:
+                    self._subscribers.remove(entry)
+
+        return unsubscribe
+
+    def publish(self, job_id, progress, message):
+        """Deliver an update unless it is throttled; returns whether it was delivered"""
+        progress = min(1.0, max(0.0, progress))
+        now = time.monotonic()
+        with self._lock:
+            last = self._last.get(job_id)
+            if last and progress < 1.0 and message == last[1] and now - last[0] < self.min_interval:
+                throttled = True
+            else:
+                throttled = False
+                self._last[job_id] = (now, message)
+                subscribers = [callback for callback, wanted in self._subscribers if wanted in (None, job_id)]
+        if self.telemetry:
+            self.telemetry.count("progress_events_total", delivered=str(not throttled).lower())
+        if throttled:
+            return False
+
+        event = ProgressEvent(job_id, progress, message)
+        for callback in subscribers:
+            try:
+                callback(event)
+            except Exception as e:
+                logging.warning(f"Progress subscriber failed: {str(e)}")
+        return True
+
+    def reporter(self, job_id):
+        """A progress_callback(progress, message) that publishes for one job"""
+        return lambda progress, message: self.publish(job_id, progress, message)
+
+    def finish(self, job_id):
+        """Forget a finished job's throttle state"""
+        with self._lock:
+            self._last.pop(job_id, None)
+
+
+@process_singleton
+def get_telemetry():
+    """The registry every job, session and worker reports to"""
+    telemetry = Telemetry(log_spans=os.getenv("GENZIFY_TELEMETRY_LOG") == "json")
+    port = os.getenv("GENZIFY_METRICS_PORT")
+    if port:
+        try:
+            serve_metrics(telemetry, int(port), os.getenv("GENZIFY_METRICS_HOST", "127.0.0.1"))
+        except OSError as e:
+            logging.warning(f"Metrics endpoint unavailable: {str(e)}")  # Another process holds the port
+    return telemetry
+
+
+@process_singleton
+def get_progress_bus():
+    return ProgressBus(float(os.getenv("GENZIFY_PROGRESS_INTERVAL", "0.5")), get_telemetry())
@@ -0,0 +1,93 @@
+import os
+import sys
+import random
+import pytest
+
+# Modules live at the repository root; the stub servers live with the benchmarks
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, "benchmarks")]
+os.environ.setdefault("GROQ_API_KEY", "stub")  # The shared client needs one; tests point clients at stubs
+
+from stub_groq_server import StubGroqServer
+from stub_storage_server import StubStorageServer
+from llm_client import LLMClient
+from llm_handler import LLMHandler
+from response_cache import ResponseCache
+from storage_manager import StorageManager, SupabaseBucket
+
+UPLOAD_PART = 64 * 1024  # Small resumable parts, so a test file spans many of them
+
+
+@pytest.fixture
+def groq_server():
+    """Start a StubGroqServer with the given options; every server started is stopped afterwards"""
+    servers = []
+
+    def start(**options):
+        server = StubGroqServer(**options).start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.stop()
+
+
+@pytest.fixture
+def llm_client():
+    """An LLMClient pointed at a stub server, with short backoff so retries are quick"""
+    def make(server, **options):
+        options.setdefault("base_delay", 0.01)
+        return LLMClient(api_key="stub", base_url=server.base_url, **options)
+
+    return make
+
+
+@pytest.fixture
+def llm_handler(llm_client):
+    """An LLMHandler on the given stub server, with an empty response cache"""
+    def make(server):
+        handler = LLMHandler()
+        handler.client = llm_client(server)
+        handler.response_cache = ResponseCache(":memory:")
+        return handler
+
+    return make
+
+
+@pytest.fixture
+def storage_server():
+    """Start a StubStorageServer with the given options; every server started is stopped afterwards"""
+    servers = []
+
+    def start(**options):
+        server = StubStorageServer(**options).start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.stop()
+
+
+@pytest.fixture
+def storage_manager():
+    """A StorageManager uploading to a stub bucket in UPLOAD_PART parts, with short backoff"""
+    def make(server, **options):
+        options.setdefault("chunk_size", UPLOAD_PART)
+        storage = StorageManager(bucket=SupabaseBucket(server.base_url, "stub", "videos"), **options)
+        storage.retry_delay = 0.001
+        return storage
+
+    return make
+
+
+@pytest.fixture
+def video_file(tmp_path):
+    """Write a file of random bytes (a stand-in video) and return its path"""
+    def make(size, seed=0, name="video.mp4"):
+        path = tmp_path / name
+        path.write_bytes(random.Random(seed).randbytes(size))
+        return str(path)
+
+    return make
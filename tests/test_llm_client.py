@@ -0,0 +1,99 @@
+import time
+import asyncio
+import threading
+import pytest
+
+MESSAGES = [{"role": "user", "content": "Summarize this."}]
+
+
+def test_rate_limit_waits_for_retry_after(groq_server, llm_client):
+    server = groq_server(rate_limit_every=2, retry_after=0.5)
+    client = llm_client(server)
+    client.create(model="stub", messages=MESSAGES)
+    start = time.monotonic()
+    response = client.create(model="stub", messages=MESSAGES)  # 429 first, then answered
+    elapsed = time.monotonic() - start
+
+    assert response.choices[0].message.content == server.reply
+    assert elapsed >= 0.5
+    assert client.stats()["rate_limited"] == 1
+    assert client.stats()["retries"] == 1
+
+
+def test_rate_limit_cooldown_is_shared(groq_server, llm_client):
+    server = groq_server(rate_limit_every=1, retry_after=0.5)
+    client = llm_client(server)
+    limited = threading.Thread(target=client.create, kwargs={"model": "stub", "messages": MESSAGES})
+    limited.start()
+    while client.stats()["rate_limited"] == 0:
+        time.sleep(0.01)
+    server.rate_limit_every = 0
+    start = time.monotonic()
+    client.create(model="stub", messages=MESSAGES)  # Waits out the other call's 429
+    elapsed = time.monotonic() - start
+    limited.join()
+
+    assert elapsed >= 0.4
+    assert server.rate_limited == 1
+
+
+def test_client_errors_are_not_retried(groq_server, llm_client):
+    server = groq_server(error_every=1, error_status=400)
+    client = llm_client(server)
+    with pytest.raises(Exception):
+        client.create(model="stub", messages=MESSAGES)
+
+    assert server.requests == 1
+    assert client.stats()["retries"] == 0
+    assert client.stats()["failed"] == 1
+
+
+def test_server_errors_are_retried(groq_server, llm_client):
+    server = groq_server(error_every=2)
+    client = llm_client(server)
+    client.create(model="stub", messages=MESSAGES)
+    client.create(model="stub", messages=MESSAGES)
+
+    assert server.requests == 3
+    assert client.stats()["retries"] == 1
+
+
+def test_timeout_bounds_all_attempts(groq_server, llm_client):
+    server = groq_server(error_every=1, latency=0.2)
+    client = llm_client(server, max_retries=100)
+    start = time.monotonic()
+    with pytest.raises(Exception, match="timed out"):
+        client.create(timeout=1.0, model="stub", messages=MESSAGES)
+    elapsed = time.monotonic() - start
+
+    assert server.requests > 1
+    assert elapsed < 1.5
+
+
+def test_concurrency_is_capped(groq_server, llm_client):
+    server = groq_server(latency=0.2)
+    client = llm_client(server, max_concurrency=2)
+    threads = [
+        threading.Thread(target=client.create, kwargs={"model": "stub", "messages": MESSAGES})
+        for _ in range(6)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert server.requests == 6
+    assert server.max_in_flight == 2
+
+
+def test_async_concurrency_is_capped_in_every_event_loop(groq_server, llm_client):
+    async def burst(client):
+        await asyncio.gather(*(client.acreate(model="stub", messages=MESSAGES) for _ in range(6)))
+
+    server = groq_server(latency=0.2)
+    client = llm_client(server, max_concurrency=2)
+    asyncio.run(burst(client))
+    asyncio.run(burst(client))  # A new loop gets its own client and semaphore
+
+    assert server.requests == 12
+    assert server.max_in_flight == 2
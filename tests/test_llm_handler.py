@@ -0,0 +1,68 @@
+import time
+import threading
+import pytest
+
+REPLY = "One two three four five six seven eight nine ten."
+
+
+def test_identical_concurrent_streams_share_one_upstream_call(groq_server, llm_handler):
+    server = groq_server(token_delay=0.02, reply=REPLY)
+    handler = llm_handler(server)
+    answers = []
+
+    def read():
+        answers.append("".join(handler.stream_answer("What is it?", "Some notes.")))
+
+    threads = [threading.Thread(target=read) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert server.requests == 1
+    assert len(answers) == 3
+    assert {answer.strip() for answer in answers} == {server.reply}
+
+
+def test_blocking_answer_joins_an_identical_stream(groq_server, llm_handler):
+    server = groq_server(token_delay=0.02, reply=REPLY)
+    handler = llm_handler(server)
+    stream = iter(handler.stream_answer("What is it?", "Some notes."))
+    first = next(stream)  # The stream is now in flight
+    answer = []
+    waiter = threading.Thread(target=lambda: answer.append(handler.generate_answer("What is it?", "Some notes.")))
+    waiter.start()
+    rest = "".join(stream)
+    waiter.join()
+
+    assert server.requests == 1
+    assert answer == [first + rest]
+
+
+def test_finished_stream_is_served_from_the_cache(groq_server, llm_handler):
+    server = groq_server(token_delay=0.02, reply=REPLY)
+    handler = llm_handler(server)
+    first = "".join(handler.stream_answer("What is it?", "Some notes."))
+    again = handler.stream_answer("What is it?", "Some notes.")
+
+    assert "".join(again) == first
+    assert again.cached
+    assert server.requests == 1
+
+
+def test_summary_stream_times_out_when_no_response_starts(groq_server, llm_handler):
+    handler = llm_handler(groq_server(latency=3))
+    start = time.monotonic()
+    with pytest.raises(Exception, match="timed out"):
+        "".join(handler.stream_summary("Some notes.", timeout=0.5))
+
+    assert time.monotonic() - start < 2
+
+
+def test_summary_stream_times_out_when_it_stalls(groq_server, llm_handler):
+    handler = llm_handler(groq_server(token_delay=3, reply=REPLY))
+    start = time.monotonic()
+    with pytest.raises(Exception):
+        "".join(handler.stream_summary("Some notes.", timeout=0.5))
+
+    assert time.monotonic() - start < 2
@@ -0,0 +1,78 @@
+import os
+import pytest
+
+
+def read(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def test_small_video_uploads_in_one_request(storage_server, storage_manager, video_file):
+    server = storage_server()
+    storage = storage_manager(server)
+    path = video_file(storage.chunk_size // 2)
+    url = storage.upload_video(path, keep_local=True)
+
+    assert url.startswith(f"{server.base_url}/storage/v1/object/public/videos/")
+    assert server.requests["upload"] == 1
+    assert read(path) in server.objects.values()
+
+
+def test_same_content_is_stored_once(storage_server, storage_manager, video_file):
+    server = storage_server()
+    storage = storage_manager(server)
+    path = video_file(storage.chunk_size * 3)
+    copy = video_file(storage.chunk_size * 3, name="copy.mp4")
+    first = storage.upload_video(path, keep_local=True)
+    received = server.bytes_received
+    second = storage.upload_video(copy, keep_local=True)
+
+    assert first == second
+    assert server.bytes_received == received
+    assert server.requests["create"] == 1
+
+
+def test_concurrent_identical_uploads_share_one_transfer(storage_server, storage_manager, video_file):
+    server = storage_server()
+    storage = storage_manager(server, max_workers=4)
+    path = video_file(storage.chunk_size * 4)
+    futures = [storage.upload_video_async(path, keep_local=True) for _ in range(4)]
+
+    assert len({future.result() for future in futures}) == 1
+    assert server.requests["create"] == 1
+    assert server.bytes_received == os.path.getsize(path)
+
+
+def test_failed_parts_are_resumed_from_the_server_offset(storage_server, storage_manager, video_file):
+    server = storage_server(fail_every=3)
+    storage = storage_manager(server)
+    path = video_file(storage.chunk_size * 10 + 123)
+    storage.upload_video(path, keep_local=True)
+
+    assert read(path) in server.objects.values()
+    assert server.requests["head"] >= 1
+    assert server.requests["create"] == 1
+
+
+def test_retry_after_a_failed_upload_resumes_it(storage_server, storage_manager, video_file):
+    server = storage_server(fail_every=4)
+    storage = storage_manager(server, max_retries=0)
+    path = video_file(storage.chunk_size * 6)
+    with pytest.raises(Exception):
+        storage.upload_video(path, keep_local=True)
+    sent = server.bytes_received
+    server.fail_every = 0
+    storage.upload_video(path, keep_local=True)
+
+    assert read(path) in server.objects.values()
+    assert server.requests["create"] == 1  # The second attempt continued the same upload
+    assert server.bytes_received - sent < os.path.getsize(path)
+
+
+@pytest.mark.parametrize("keep_local", [True, False])
+def test_keep_local(storage_server, storage_manager, video_file, keep_local):
+    storage = storage_manager(storage_server())
+    path = video_file(storage.chunk_size)
+    storage.upload_video(path, keep_local=keep_local)
+
+    assert os.path.exists(path) == keep_local
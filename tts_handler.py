@@ -1,51 +1,70 @@
 from gtts import gTTS
 import os
-import streamlit as st
-from pydub import AudioSegment
+import queue
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from disk_cache import DiskCache
+from audio_utils import concat_mp3, get_audio_info
+from telemetry import get_telemetry
+
+class GTTSSynthesizer:
+    """Google Text-to-Speech backend"""
+    name = "gtts"
+
+    def synthesize(self, text, lang, slow, output_path):
+        tts = gTTS(text=text, lang=lang, slow=slow)
+        tts.save(output_path)
 
 class TTSHandler:
-    def __init__(self):
-        self.temp_dir = "temp_audio"
-        os.makedirs(self.temp_dir, exist_ok=True)
+    def __init__(self, synthesizer=None, max_workers=4):
+        # Any object with a name and synthesize(text, lang, slow, output_path) can stand in for gTTS
+        self.synthesizer = synthesizer or GTTSSynthesizer()
+        self.lang = 'en'
+        self.slow = False
+        self.max_workers = max_workers
+        
+        # Synthesized chunks are reused across summaries and retries
+        base_dir = os.path.dirname(os.path.abspath(__file__))
+        self.cache = DiskCache(os.path.join(base_dir, "tts_cache"), 200 * 1024 * 1024)
+        self.telemetry = get_telemetry()
 
-    def generate_speech(self, text, progress_callback=None):
-        """Generate speech using Google Text-to-Speech"""
+    def generate_speech(self, text, workspace, progress_callback=None):
+        """Generate speech using Google Text-to-Speech
+
+        Files are written to the job's workspace, which the caller owns and cleans up (the
+        returned file lives there, so the handler can't create one of its own). The handler
+        keeps no per-call state, so one instance can serve concurrent jobs; chunk boundaries
+        are available from get_audio_info(output).chunk_offsets.
+        """
         try:
-            # Create progress indicators if not provided
-            if not progress_callback:
-                progress_bar = st.progress(0)
-                status_text = st.empty()
-                def progress_callback(progress, message):
-                    progress_bar.progress(progress)
-                    status_text.text(message)
+            progress_callback = progress_callback or (lambda progress, message: None)
 
             # Split text into chunks
             chunks = self._split_into_chunks(text)
             total_chunks = len(chunks)
-            audio_parts = []
-
-            # Generate audio for each chunk
-            for i, chunk in enumerate(chunks, 1):
-                progress = (i - 1) / total_chunks
-                progress_callback(progress, f"Converting to speech... ({i}/{total_chunks})")
+            audio_parts = [None] * total_chunks
 
-                # Generate speech
-                tts = gTTS(text=chunk, lang='en', slow=False)
-                temp_file = os.path.join(self.temp_dir, f"temp_audio_{i}.mp3")
-                tts.save(temp_file)
-                audio_parts.append(temp_file)
+            # Generate audio for chunks concurrently, keeping their original order
+            progress_callback(0, f"Converting to speech... (0/{total_chunks})")
+            with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                futures = {
+                    pool.submit(self._synthesize_chunk, workspace, i, chunk): i
+                    for i, chunk in enumerate(chunks, 1)
+                }
+                for done, future in enumerate(as_completed(futures), 1):
+                    audio_parts[futures[future] - 1] = future.result()
+                    progress_callback(done / total_chunks * 0.9, f"Converting to speech... ({done}/{total_chunks})")
 
             # Combine audio parts if multiple chunks
             if len(audio_parts) > 1:
                 progress_callback(0.9, "Combining audio chunks...")
-                combined = AudioSegment.from_mp3(audio_parts[0])
-                for audio_file in audio_parts[1:]:
-                    combined += AudioSegment.from_mp3(audio_file)
-                
-                output_file = os.path.join(self.temp_dir, "output.mp3")
-                combined.export(output_file, format="mp3")
+                # Join MP3 frames directly: constant memory, no lossy second encode
+                output_file = workspace.path("output.mp3")
+                concat_mp3(audio_parts, output_file)
             else:
                 output_file = audio_parts[0]
+                get_audio_info(output_file)  # Probe once so later readers hit the cache
 
             # Cleanup temporary files
             for temp_file in audio_parts:
@@ -61,6 +80,77 @@ class TTSHandler:
         except Exception as e:
             raise Exception(f"Error generating speech: {str(e)}")
 
+    def stream_speech(self, text_chunks, workspace):
+        """Synthesize text chunks as they arrive, yielding (text, audio_path, duration) in order
+
+        A feeder thread pulls chunks and keeps up to max_workers syntheses running, so a slow
+        producer (a streaming summary) never delays chunks that are already synthesized.
+        """
+        pending = queue.Queue(maxsize=self.max_workers)  # Bounded: a slow consumer stalls the feeder
+        stop = threading.Event()
+        pool = ThreadPoolExecutor(max_workers=self.max_workers)
+
+        def put(item):
+            while not stop.is_set():
+                try:
+                    pending.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+
+        def feed():
+            chunks = iter(text_chunks)
+            try:
+                for index, chunk in enumerate(chunks, 1):
+                    if not put((chunk, pool.submit(self._synthesize_chunk, workspace, index, chunk))):
+                        break
+                else:
+                    put(None)
+            except Exception as e:
+                put(e)
+            finally:
+                # Stopped early: release the producer (e.g. an open LLM stream) right away
+                if hasattr(chunks, "close"):
+                    chunks.close()
+
+        feeder = threading.Thread(target=feed, name="tts-feeder", daemon=True)
+        feeder.start()
+        try:
+            while True:
+                item = pending.get()
+                if item is None:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                chunk, future = item
+                audio_path = future.result()
+                yield chunk, audio_path, get_audio_info(audio_path).duration
+        finally:
+            # Consumer finished or gave up: stop the feeder and drop queued work
+            stop.set()
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def _synthesize_chunk(self, workspace, index, chunk):
+        """Synthesize one chunk into the workspace, served from the cache when possible"""
+        temp_file = workspace.path(f"temp_audio_{index}.mp3")
+        key = DiskCache.key(chunk, self.lang, self.slow, self.synthesizer.name)
+        
+        cached = self.cache.get(key, ".mp3")
+        if cached:
+            try:
+                shutil.copyfile(cached, temp_file)
+                self.telemetry.count("tts_chunks_total", cache="hit")
+                return temp_file
+            except OSError:
+                pass  # Evicted in the meantime, synthesize again
+        
+        with self.telemetry.span("tts_synthesize", synthesizer=self.synthesizer.name).set(chars=len(chunk)):
+            self.synthesizer.synthesize(chunk, self.lang, self.slow, temp_file)
+        self.telemetry.count("tts_chunks_total", cache="miss")
+        self.cache.put(key, temp_file, ".mp3")
+        return temp_file
+
     def _split_into_chunks(self, text, max_chars=5000):
         """Split text into smaller chunks for TTS processing"""
         sentences = text.replace('\n', ' ').split('. ')
@@ -90,13 +180,4 @@ class TTSHandler:
         if current_chunk:
             chunks.append(' '.join(current_chunk))
         
-        return chunks
-
-    def __del__(self):
-        """Cleanup temporary directory on object destruction"""
-        try:
-            import shutil
-            if os.path.exists(self.temp_dir):
-                shutil.rmtree(self.temp_dir)
-        except:
-            pass
\ No newline at end of file
+        return chunks
\ No newline at end of file
@@ -1,8 +1,24 @@
 import os
+import functools
+import threading
 from dotenv import load_dotenv
 
 load_dotenv()
 
+def process_singleton(factory):
+    """Decorator for shared services: the factory runs on first call and later calls return its result"""
+    lock = threading.Lock()
+    instances = []
+
+    @functools.wraps(factory)
+    def get():
+        with lock:
+            if not instances:
+                instances.append(factory())
+            return instances[0]
+
+    return get
+
 def get_env_variable(name):
     value = os.getenv(name)
     if value is None:
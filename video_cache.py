@@ -0,0 +1,63 @@
+import os
+import json
+from utils import process_singleton
+from disk_cache import DiskCache, file_digest
+
+
+class VideoCache:
+    """Finished videos by what they were made from, under a disk quota with LRU eviction
+
+    Each entry is {key}.mp4, plus {key}.json with its storage URL once it has been uploaded,
+    so a video evicted from disk can still be served from storage.
+    """
+
+    def __init__(self, cache_dir, max_bytes):
+        self.files = DiskCache(cache_dir, max_bytes)
+
+    @staticmethod
+    def key(texts, audio_paths, background, settings):
+        """Hash of the captions, the speech audio, the background asset and the render settings"""
+        return DiskCache.key("video", texts, [file_digest(path) for path in audio_paths], background, settings)
+
+    def get(self, key):
+        """{"video_path", "video_url"} for a finished video (either may be None), or None"""
+        path = self.files.get(key, ".mp4")
+        url = self._url(key)
+        if path is None and url is None:
+            return None
+        return {"video_path": path, "video_url": url}
+
+    def put(self, key, video_path):
+        """Move a finished video into the cache and return its new path"""
+        return self.files.put(key, video_path, ".mp4", move=True)
+
+    def url(self, video_path):
+        """Storage URL recorded for a cached video, or None"""
+        return self._url(self._key_of(video_path))
+
+    def set_url(self, video_path, url):
+        """Remember where a cached video was uploaded"""
+        self.files.put_bytes(self._key_of(video_path), json.dumps({"url": url}).encode('utf-8'), ".json")
+
+    def _url(self, key):
+        data = self.files.get_bytes(key, ".json")
+        if data is None:
+            return None
+        try:
+            return json.loads(data.decode('utf-8')).get("url")
+        except ValueError:
+            return None
+
+    @staticmethod
+    def _key_of(video_path):
+        return os.path.splitext(os.path.basename(video_path))[0]
+
+
+@process_singleton
+def get_video_cache():
+    """The shared cache, or None when GENZIFY_VIDEO_CACHE_MB is 0 (every request renders)"""
+    quota_mb = int(os.getenv("GENZIFY_VIDEO_CACHE_MB", "2048"))
+    if quota_mb <= 0:
+        return None
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    return VideoCache(os.path.join(base_dir, "generated_videos"), quota_mb * 1024 * 1024)
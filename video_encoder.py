@@ -0,0 +1,267 @@
+import cv2
+import numpy as np
+import os
+import queue
+import logging
+import threading
+import subprocess
+import tempfile
+
+# x264 CRF per quality preset: lower looks better and takes more bits
+QUALITY_PRESETS = {"draft": 30, "standard": 23, "high": 19}
+# x264 preset per speed preset: slower presets find a smaller file at the same quality
+SPEED_PRESETS = {"fastest": "ultrafast", "fast": "veryfast", "balanced": "fast", "compact": "medium"}
+
+
+class RateControl:
+    """How libx264 spends bits: constant quality, or constant quality held under a size budget
+
+    "crf" ignores the budget. "single_pass" caps the bitrate (VBV) at what fits the budget for
+    the video's duration, so one encode normally fits. "two_pass" encodes at full quality and,
+    only when that misses the budget, re-encodes in two passes at the budget's bitrate.
+    Either budgeted mode falls back to the two-pass re-encode if the file still comes out too big.
+    """
+
+    MODES = ("crf", "single_pass", "two_pass")
+
+    def __init__(self, mode="single_pass", quality="standard", speed="balanced", audio_bitrate=192000,
+                 container_overhead=0.02, min_video_bitrate=300000):
+        if mode not in self.MODES:
+            raise Exception(f"Unknown rate control mode: {mode}")
+        if quality not in QUALITY_PRESETS:
+            raise Exception(f"Unknown quality preset: {quality}")
+        if speed not in SPEED_PRESETS:
+            raise Exception(f"Unknown speed preset: {speed}")
+        self.mode = mode
+        self.quality = quality
+        self.speed = speed
+        self.audio_bitrate = audio_bitrate  # Matches the AAC track every encode writes
+        self.container_overhead = container_overhead  # MP4 boxes and index, as a share of the file
+        self.min_video_bitrate = min_video_bitrate  # Floor so very long videos stay watchable
+
+    @property
+    def budgeted(self):
+        return self.mode != "crf"
+
+    def target_bitrate(self, duration, max_bytes):
+        """Video bits per second that fit max_bytes over duration seconds, after audio and container"""
+        total = max_bytes * 8 * (1 - self.container_overhead) / max(duration, 1.0)
+        return max(self.min_video_bitrate, int(total - self.audio_bitrate))
+
+    def video_args(self, duration=None, max_bytes=None):
+        """libx264 arguments for a single encode of a video about duration seconds long"""
+        args = ["-c:v", "libx264", "-preset", SPEED_PRESETS[self.speed], "-crf", str(QUALITY_PRESETS[self.quality])]
+        if self.mode == "single_pass" and duration and max_bytes:
+            bitrate = self.target_bitrate(duration, max_bytes)
+            args += ["-maxrate", str(bitrate), "-bufsize", str(2 * bitrate)]
+        return args
+
+
+def two_pass_encode(input_path, output_path, bitrate, speed="balanced"):
+    """Re-encode a finished video at an average bitrate in two passes, copying its audio"""
+    log_dir = tempfile.mkdtemp(prefix="x264_2pass_")
+    common = [
+        "-c:v", "libx264", "-preset", SPEED_PRESETS[speed], "-b:v", str(bitrate),
+        "-pix_fmt", "yuv420p", "-passlogfile", os.path.join(log_dir, "pass"),
+    ]
+    passes = [
+        ["-pass", "1", "-an", "-f", "null", os.devnull],
+        ["-pass", "2", "-c:a", "copy", "-movflags", "+faststart", output_path],
+    ]
+    try:
+        for args in passes:
+            cmd = ["ffmpeg", "-y", "-v", "error", "-i", input_path] + common + args
+            result = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+            if result.returncode != 0:
+                raise Exception(f"Two-pass encode failed: {result.stderr.strip()}")
+    finally:
+        for name in os.listdir(log_dir):
+            os.remove(os.path.join(log_dir, name))
+        os.rmdir(log_dir)
+    return output_path
+
+
+class FFmpegPipeEncoder:
+    """Streams raw BGR frames into a single ffmpeg process that writes the final file"""
+
+    def __init__(self, output_path, width, height, fps, audio_path=None, video_args=None):
+        self.output_path = output_path
+        if video_args is None:
+            video_args = ["-c:v", "libx264", "-preset", "fast"]
+
+        cmd = [
+            "ffmpeg", "-y", "-v", "error",
+            "-f", "rawvideo", "-pix_fmt", "bgr24",
+            "-s", f"{width}x{height}", "-r", str(fps),
+            "-i", "pipe:0",
+        ]
+        if audio_path:
+            cmd += ["-i", audio_path, "-map", "0:v", "-map", "1:a"]
+        cmd += video_args
+        cmd += ["-pix_fmt", "yuv420p"]  # Ensure pixel format is compatible
+        if audio_path:
+            cmd += ["-c:a", "aac", "-b:a", "192k", "-shortest"]
+        cmd += ["-movflags", "+faststart", output_path]
+
+        # Errors go to a file so a chatty ffmpeg can never block on a full pipe
+        self.log = tempfile.TemporaryFile()
+        self.process = subprocess.Popen(cmd, stdin=subprocess.PIPE, stderr=self.log)
+
+    def write(self, frame):
+        try:
+            self.process.stdin.write(np.ascontiguousarray(frame).data)
+        except BrokenPipeError:
+            raise Exception(f"ffmpeg stopped accepting frames: {self._errors()}")
+
+    def close(self):
+        """Flush remaining frames and wait for the encoded file"""
+        try:
+            self.process.stdin.close()
+        except BrokenPipeError:
+            pass
+        result = self.process.wait()
+        errors = self._errors()
+        self.log.close()
+        if result != 0 or not os.path.exists(self.output_path):
+            raise Exception(f"Failed to encode video: {errors}")
+        return self.output_path
+
+    def abort(self):
+        if self.process.poll() is None:
+            self.process.kill()
+            self.process.wait()
+        self.log.close()
+
+    def _errors(self):
+        try:
+            self.log.seek(0)
+            return self.log.read().decode(errors='replace').strip()
+        except Exception:
+            return ""
+
+
+class ThreadedFrameWriter:
+    """Hands frames to an encoder on a background thread through a bounded queue
+
+    The renderer keeps drawing while earlier frames are written; once max_pending frames
+    are waiting, write() blocks until the encoder catches up.
+    """
+
+    def __init__(self, encoder, max_pending=8):
+        self.encoder = encoder
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._error = None
+        self._thread = threading.Thread(target=self._run, name="frame-writer", daemon=True)
+        self._thread.start()
+
+    def write(self, frame):
+        if self._error:
+            raise self._error
+        self._queue.put(frame)
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+        if self._error:
+            self.encoder.abort()
+            raise self._error
+        return self.encoder.close()
+
+    def abort(self):
+        self._error = self._error or Exception("Encoding aborted")
+        self._drain()
+        self.encoder.abort()  # Unblocks a write stuck on the encoder's pipe
+        self._queue.put(None)
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            frame = self._queue.get()
+            if frame is None:
+                return
+            if self._error:
+                continue  # Keep draining so the renderer never blocks on a dead encoder
+            try:
+                self.encoder.write(frame)
+            except Exception as e:
+                self._error = e
+
+    def _drain(self):
+        try:
+            while True:
+                self._queue.get_nowait()
+        except queue.Empty:
+            pass
+
+
+def mux_audio(video_path, audio_path, output_path):
+    """Add an audio track to a finished video without re-encoding the video"""
+    cmd = [
+        "ffmpeg", "-y", "-v", "error",
+        "-i", video_path, "-i", audio_path,
+        "-map", "0:v", "-map", "1:a",
+        "-c:v", "copy",
+        "-c:a", "aac", "-b:a", "192k",
+        "-shortest",
+        "-movflags", "+faststart",
+        output_path,
+    ]
+    result = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    if result.returncode != 0 or not os.path.exists(output_path):
+        raise Exception(f"Failed to add audio to video: {result.stderr.strip()}")
+    return output_path
+
+
+def concat_segments(segment_paths, audio_path, output_path):
+    """Join encoded segments without re-encoding video and mux in the audio"""
+    list_file = tempfile.NamedTemporaryFile('w', suffix='.txt', delete=False)
+    try:
+        with list_file:
+            for path in segment_paths:
+                escaped = os.path.abspath(path).replace("'", "'\\''")
+                list_file.write(f"file '{escaped}'\n")
+
+        cmd = [
+            "ffmpeg", "-y", "-v", "error",
+            "-f", "concat", "-safe", "0", "-i", list_file.name,
+            "-i", audio_path,
+            "-map", "0:v", "-map", "1:a",
+            "-c:v", "copy",
+            "-c:a", "aac", "-b:a", "192k",
+            "-shortest",
+            "-movflags", "+faststart",
+            output_path,
+        ]
+        result = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+        if result.returncode != 0 or not os.path.exists(output_path):
+            raise Exception(f"Failed to join video segments: {result.stderr.strip()}")
+        return output_path
+    finally:
+        os.remove(list_file.name)
+
+
+class OpenCVEncoder:
+    """Fallback: write an mp4v temp file, then hand it to a finishing step that adds audio"""
+
+    def __init__(self, temp_path, output_path, width, height, fps, audio_path, finalize):
+        self.temp_path = temp_path
+        self.output_path = output_path
+        self.audio_path = audio_path
+        self.finalize = finalize
+        fourcc = cv2.VideoWriter_fourcc(*'mp4v')
+        self.writer = cv2.VideoWriter(temp_path, fourcc, fps, (width, height))
+
+    def write(self, frame):
+        self.writer.write(frame)
+
+    def close(self):
+        self.writer.release()
+        self.finalize(self.temp_path, self.audio_path, self.output_path)
+        try:
+            os.remove(self.temp_path)
+        except OSError:
+            logging.warning(f"Could not remove temporary video: {self.temp_path}")
+        return self.output_path
+
+    def abort(self):
+        self.writer.release()
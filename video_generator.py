@@ -2,92 +2,190 @@ import cv2
 import numpy as np
 import os
 import logging
-from PIL import Image, ImageDraw, ImageFont
-import streamlit as st
+import shutil
 import time
-from datetime import datetime
-from pydub import AudioSegment
+from job_workspace import JobWorkspace
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import multiprocessing
+from audio_utils import get_audio_info, concat_mp3
+from caption_renderer import CaptionRenderer
+from background_cache import BackgroundCache, CaptureReader
+from video_encoder import (
+    FFmpegPipeEncoder, OpenCVEncoder, ThreadedFrameWriter, RateControl,
+    concat_segments, mux_audio, two_pass_encode,
+)
+from subtitle_renderer import SubtitleRenderer
+from telemetry import get_telemetry
+from video_cache import VideoCache, get_video_cache
+
+# Output settings per render profile. A draft renders the same timeline at a quarter of the
+# pixels and half the frames, for a preview before committing to the full render.
+RENDER_PROFILES = {
+    "full": {"width": 1080, "height": 1920, "fps": 30},
+    "draft": {"width": 540, "height": 960, "fps": 15, "quality": "draft", "speed": "fastest"},
+}
+
+# Part of every cached video's key: bump it when a rendering change should invalidate finished videos
+VIDEO_CACHE_VERSION = 1
+
+# About how fast gTTS speaks at normal speed, for estimating a video's length from its word count
+SPEECH_WORDS_PER_SECOND = 2.5
 
 class VideoGenerator:
-    def __init__(self):
+    def __init__(self, profile="full"):
         # Create absolute paths for directories
         self.base_dir = os.path.dirname(os.path.abspath(__file__))
         self.output_dir = os.path.join(self.base_dir, "generated_videos")
         self.background_video = os.path.join(self.base_dir, "assets", "background_videos", "subway_surfers.mp4")
+        self.background_cache_dir = os.path.join(self.base_dir, "background_cache")
         
         # Create directories if they don't exist
         os.makedirs(self.output_dir, exist_ok=True)
         
         # Video settings
-        self.width = 1080
-        self.height = 1920
+        if profile not in RENDER_PROFILES:
+            raise Exception(f"Unknown render profile: {profile}")
+        settings = RENDER_PROFILES[profile]
+        self.profile = profile
+        self.width = settings["width"]
+        self.height = settings["height"]
         self.max_file_size = 45 * 1024 * 1024  # 45MB target size
-        self.total_steps = 4
         self.words_per_frame = 2
         self.max_duration = 240  # 4 minutes
-        self.fps = 30  # Define FPS explicitly
+        self.fps = settings["fps"]
+        self.encoder_backend = "ffmpeg"  # "ffmpeg" (single pass) or "opencv" (legacy VideoWriter)
+        self.render_workers = int(os.getenv("GENZIFY_RENDER_WORKERS", "1"))  # >1 renders segments in parallel
+        self.render_engine = os.getenv("GENZIFY_RENDER_ENGINE", "frames")  # "frames" (OpenCV/PIL) or "subtitles" (ASS burn-in)
+        # Keeps encodes under max_file_size; see RateControl for the modes and presets
+        self.rate_control = RateControl(
+            mode=os.getenv("GENZIFY_RATE_CONTROL", "single_pass"),
+            quality=settings.get("quality") or os.getenv("GENZIFY_QUALITY", "standard"),
+            speed=settings.get("speed") or os.getenv("GENZIFY_ENCODE_SPEED", "balanced")
+        )
+        self.telemetry = get_telemetry()
+        # Finished videos by captions, speech, background and settings. It manages generated_videos/,
+        # so renders are written to the job workspace and moved in. None (GENZIFY_VIDEO_CACHE_MB=0)
+        # renders every request, straight into generated_videos/.
+        self.video_cache = get_video_cache()
+        self._build_components()
         
         if not os.path.exists(self.background_video):
             logging.warning(f"Background video not found at: {self.background_video}")
 
-    def _process_background_frame(self, frame):
-        """Process background frame to fit 9:16 without stretching"""
-        if frame is None:
+    def _build_components(self):
+        """Create the caption renderer and background cache for the current settings"""
+        font_size, outline_width = caption_sizes(self.width)
+        self.caption_renderer = CaptionRenderer(
+            self.width, self.height, self.words_per_frame, font_size=font_size, outline_width=outline_width
+        )
+        self.background_cache = BackgroundCache(self.background_cache_dir, self.width, self.height, self.fps)
+        self.subtitle_renderer = SubtitleRenderer(
+            self.width, self.height, self.fps, font_size=font_size, outline_width=outline_width
+        )
+
+    def _segment_settings(self):
+        """Plain settings a worker process needs to render frames exactly like this instance
+
+        Workers rebuild only the caption renderer and background source from these, never a
+        whole VideoGenerator with its caches and output directory.
+        """
+        return {
+            "width": self.width,
+            "height": self.height,
+            "fps": self.fps,
+            "words_per_frame": self.words_per_frame,
+            "background_video": self.background_video,
+            "background_cache_dir": self.background_cache_dir,
+        }
+
+    def _render_settings(self):
+        """Everything besides captions and speech that changes the finished video"""
+        return {
+            "version": VIDEO_CACHE_VERSION,
+            "profile": self.profile,
+            "width": self.width,
+            "height": self.height,
+            "fps": self.fps,
+            "words_per_frame": self.words_per_frame,
+            "render_engine": self.render_engine,
+            "encoder_backend": self.encoder_backend,
+            "rate_control": [self.rate_control.mode, self.rate_control.quality, self.rate_control.speed],
+            "max_file_size": self.max_file_size,
+        }
+
+    def _background_identity(self):
+        """Cheap stand-in for the background's content: path, size and modification time"""
+        if not os.path.exists(self.background_video):
             return None
+        stat = os.stat(self.background_video)
+        return [os.path.abspath(self.background_video), stat.st_size, stat.st_mtime_ns]
 
-        # Get original dimensions
-        h, w = frame.shape[:2]
-        
-        # Calculate scaling factor to maintain aspect ratio
-        scale = max(self.width/w, self.height/h)
-        
-        # Calculate new dimensions
-        new_w = int(w * scale)
-        new_h = int(h * scale)
-        
-        # Resize frame maintaining aspect ratio
-        resized = cv2.resize(frame, (new_w, new_h))
-        
-        # Create black canvas of target size
-        canvas = np.zeros((self.height, self.width, 3), dtype=np.uint8)
-        
-        # Calculate position to center the frame
-        x_offset = (self.width - new_w) // 2
-        y_offset = (self.height - new_h) // 2
-        
-        # Copy the resized frame onto the canvas
-        if x_offset < 0:
-            # Crop width if too wide
-            start_x = -x_offset
-            canvas[:, :] = resized[y_offset:y_offset+self.height, start_x:start_x+self.width]
-        else:
-            # Center if too narrow
-            canvas[y_offset:y_offset+new_h, x_offset:x_offset+new_w] = resized
-        
-        return canvas
+    def video_key(self, texts, audio_paths):
+        """Cache key of the video these caption texts and speech files render to with the current settings"""
+        return VideoCache.key(texts, audio_paths, self._background_identity(), self._render_settings())
+
+    def cached_video(self, texts, audio_paths):
+        """{"video_path", "video_url"} of an identical video made before, or None"""
+        if self.video_cache is None:
+            return None
+        hit = self.video_cache.get(self.video_key(texts, audio_paths))
+        self.telemetry.count("video_cache_total", result="hit" if hit else "miss")
+        return hit
+
+    def _output_path(self, workspace):
+        if self.video_cache is not None:
+            return workspace.path("final.mp4")
+        return os.path.join(self.output_dir, f"final_{workspace.id}.mp4")
+
+    def _store_video(self, texts, audio_paths, video_path):
+        """Move a finished video into the video cache (if any) and return where it now lives"""
+        if self.video_cache is None:
+            return video_path
+        return self.video_cache.put(self.video_key(texts, audio_paths), video_path)
+
+    def _open_background(self, start_frame=0):
+        """Open a looping frame source already sized to the output"""
+        return open_background(self.background_cache, self.background_video, self.width, self.height, start_frame)
+
+    def _video_args(self, duration):
+        """Encoder arguments for a video of about duration seconds under the size budget"""
+        return self.rate_control.video_args(duration, self.max_file_size)
 
-    def create_video(self, text_content, audio_file):
+    def _open_encoder(self, temp_output, final_output, audio_file, duration):
+        """Open the frame sink that produces the final muxed video"""
+        if self.encoder_backend == "ffmpeg" and shutil.which("ffmpeg"):
+            return FFmpegPipeEncoder(
+                final_output, self.width, self.height, self.fps, audio_file, self._video_args(duration)
+            )
+        return OpenCVEncoder(
+            temp_output, final_output, self.width, self.height, self.fps, audio_file,
+            self._finalize_opencv_output
+        )
+
+    def _finalize_opencv_output(self, video_path, audio_path, output_path):
+        """Mux audio into the VideoWriter output and make it web-compatible"""
+        self._combine_video_audio(video_path, audio_path, output_path)
+        self._ensure_web_compatible(output_path)
+
+    def create_video(self, text_content, audio_file, workspace=None, progress_callback=None):
+        # Scratch files live in the job's workspace; one we create here is also ours to clean up
+        owns_workspace = workspace is None
+        workspace = workspace or JobWorkspace()
+        progress_callback = progress_callback or (lambda progress, message: None)
         try:
-            # Create progress indicators
-            progress_bar = st.progress(0)
-            status_text = st.empty()
-            
             def update_progress(step_name, sub_progress=0):
-                """Update overall progress bar and status"""
-                total_progress = min(1.0, (self.current_step + sub_progress) / self.total_steps)
-                progress_bar.progress(total_progress)
-                percentage = int(total_progress * 100)
-                status_text.text(f"Progress: {percentage}% - {step_name}")
+                """Update overall progress; sub_progress is the fraction of the frame stage done"""
+                progress_callback(min(1.0, self.current_step + sub_progress * 0.4), step_name)
 
             # Check audio duration
             audio_duration = self._get_audio_duration(audio_file)
             if audio_duration > self.max_duration:
                 raise Exception(f"Audio duration ({audio_duration}s) exceeds maximum allowed duration ({self.max_duration}s)")
+            started = time.perf_counter()
 
             # Generate unique filenames with absolute paths
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            temp_output = os.path.join(self.output_dir, f"temp_{timestamp}.mp4")
-            final_output = os.path.join(self.output_dir, f"final_{timestamp}.mp4")
+            temp_output = workspace.path("temp.mp4")
+            final_output = self._output_path(workspace)
             
             # Step 1: Initialize and prepare data (20%)
             self.current_step = 0
@@ -100,7 +198,6 @@ class VideoGenerator:
             self.current_step = 0.2
             update_progress("Processing audio...")
             
-            audio_duration = self._get_audio_duration(audio_file)
             words_per_second = len(word_chunks) / audio_duration
             frames_per_word = int(30 / words_per_second)
 
@@ -108,22 +205,6 @@ class VideoGenerator:
             self.current_step = 0.4
             update_progress("Generating video frames...")
             
-            # Initialize video capture
-            cap = cv2.VideoCapture(self.background_video)
-            if not cap.isOpened():
-                raise Exception("Error: Could not open background video")
-
-            # Set up video writer
-            fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-            out = cv2.VideoWriter(
-                temp_output,
-                fourcc,
-                self.fps,
-                (self.width, self.height)
-            )
-
-            # Get precise audio duration
-            audio_duration = self._get_audio_duration(audio_file)
             words = self._chunk_into_words(text_content)
             total_words = len(words)
             
@@ -133,63 +214,37 @@ class VideoGenerator:
             words_per_second = total_words / audio_duration
             frames_per_word = frames_per_second / words_per_second
             
-            # Generate frames with precise timing
-            frame_count = 0
-            word_index = 0
-            
-            while frame_count < total_frames:
-                ret, frame = cap.read()
-                if not ret:
-                    cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
-                    ret, frame = cap.read()
-
-                # Process frame to fit 9:16 without stretching
-                frame = self._process_background_frame(frame)
-                
-                # Update word index based on precise timing
-                word_index = min(int(frame_count / frames_per_word), total_words - 1)
-                
-                # Get words to display
-                current_words = []
-                if word_index < total_words:
-                    current_word = words[word_index]
-                    if len(current_word) > 10:
-                        # Show long word alone
-                        current_words = [current_word]
-                    else:
-                        # Check next word if available
-                        current_words = [current_word]
-                        if word_index + 1 < total_words:
-                            next_word = words[word_index + 1]
-                            if len(next_word) <= 10:
-                                current_words.append(next_word)
+            if self._use_subtitle_engine():
+                # Let ffmpeg burn the captions in natively, no per-frame Python work
+                with self.telemetry.span("render", engine="subtitles").set(frames=total_frames):
+                    self._render_subtitles(words, frames_per_word, total_frames, audio_file, final_output, workspace,
+                                           lambda frame_count: update_progress("Generating video frames...", frame_count / total_frames))
+                self.current_step = 0.8
+                update_progress("Adding audio...")
+            elif self._use_parallel_render(total_frames):
+                # Render segments on worker processes, then join them with the audio
+                with self.telemetry.span("render", engine="parallel").set(frames=total_frames):
+                    self._render_parallel(words, frames_per_word, total_frames, audio_file, final_output, workspace,
+                                          lambda sub_progress: update_progress("Generating video frames...", sub_progress))
+                self.current_step = 0.8
+                update_progress("Adding audio...")
+            else:
+                # Set up video encoder (audio is muxed in by the encoder)
+                out = self._open_encoder(temp_output, final_output, audio_file, audio_duration)
                 
-                # Add text to frame
-                if current_words:
-                    display_text = ' '.join(current_words)
-                    frame = self._add_text_to_frame(frame, display_text)
-                
-                out.write(frame)
-                frame_count += 1
-
-                # Update progress
-                sub_progress = frame_count / total_frames
-                update_progress("Generating video frames...", sub_progress)
-
-            # Clean up
-            cap.release()
-            out.release()
+                with self.telemetry.span("render", engine="frames").set(frames=total_frames):
+                    self._render_frames(words, frames_per_word, 0, total_frames, out,
+                                        lambda frame_count: update_progress("Generating video frames...", frame_count / total_frames))
 
-            # Step 4: Combine video and audio (15%)
-            self.current_step = 0.8
-            update_progress("Adding audio...")
-            self._combine_video_audio(temp_output, audio_file, final_output)
-
-            # Ensure video is web-compatible
-            self._ensure_web_compatible(final_output)
+                # Step 4: Finish encoding with audio (15%)
+                self.current_step = 0.8
+                update_progress("Adding audio...")
+                with self.telemetry.span("encode_finish"):
+                    out.close()
+            self.telemetry.count("frames_rendered_total", total_frames)
             
             # Log the file location
-            st.write(f"Video saved to: {final_output}")
+            logging.info(f"Video saved to: {final_output}")
             
             # Verify file exists and is not empty
             if not os.path.exists(final_output):
@@ -198,19 +253,243 @@ class VideoGenerator:
             if os.path.getsize(final_output) == 0:
                 raise Exception("Output video file is empty")
 
-            # Clear progress indicators after successful completion
-            progress_bar.empty()
-            status_text.empty()
-            
+            self._fit_to_budget(final_output, audio_duration, workspace, started, progress_callback)
+            final_output = self._store_video([text_content], [audio_file], final_output)
+            progress_callback(1.0, "Done")
             return final_output
 
         except Exception as e:
             # Clean up in case of error
-            if 'cap' in locals():
-                cap.release()
             if 'out' in locals():
-                out.release()
+                out.abort()
+            raise Exception(f"Error generating video: {str(e)}")
+
+        finally:
+            if owns_workspace:
+                workspace.cleanup()
+
+    def create_video_from_chunks(self, audio_chunks, workspace=None, progress_callback=None, expected_words=None):
+        """Render and encode speech chunks as they arrive, then mux in the joined audio
+
+        audio_chunks yields (text, audio_path, duration) in speaking order. Each chunk's frames
+        are drawn as soon as its duration is known and go straight to the encoder, so rendering
+        overlaps whatever produces the chunks. expected_words sizes the progress estimate and
+        the encoder's bitrate cap.
+        """
+        owns_workspace = workspace is None
+        workspace = workspace or JobWorkspace()
+        progress_callback = progress_callback or (lambda progress, message: None)
+        video_only = workspace.path("video_only.mp4")
+        final_output = self._output_path(workspace)
+        started = time.perf_counter()
+        background = None
+        out = None
+        try:
+            # Background first: if it can't be opened, no encoder process is left waiting for frames
+            background = self._open_background(0)
+            # The length is unknown until the last chunk: cap the bitrate for the expected narration.
+            # A longer video than estimated is brought back under budget by _fit_to_budget.
+            expected_seconds = self.max_duration
+            if expected_words:
+                expected_seconds = min(self.max_duration, expected_words / SPEECH_WORDS_PER_SECOND)
+            out = ThreadedFrameWriter(FFmpegPipeEncoder(
+                video_only, self.width, self.height, self.fps, video_args=self._video_args(expected_seconds)
+            ))
+            texts = []
+            audio_parts = []
+            total_seconds = 0.0
+            frame_index = 0
+            words_seen = 0
+            progress = 0.0
+            for text, audio_path, duration in audio_chunks:
+                total_seconds += duration
+                if total_seconds > self.max_duration:
+                    raise Exception(f"Audio duration ({total_seconds}s) exceeds maximum allowed duration ({self.max_duration}s)")
+                texts.append(text)
+                audio_parts.append(audio_path)
+                
+                # Frame boundaries follow the running audio total so captions never drift
+                words = self._chunk_into_words(text)
+                end_frame = int(round(total_seconds * self.fps))
+                chunk_frames = end_frame - frame_index
+                frames_per_word = chunk_frames / max(len(words), 1)
+                with self.telemetry.span("render_chunk", engine="frames").set(frames=chunk_frames):
+                    for i in range(chunk_frames):
+                        frame = background.read()
+                        display_text = caption_for_frame(words, i, frames_per_word) if words else None
+                        if display_text:
+                            frame = self._add_text_to_frame(frame, display_text)
+                        out.write(frame)
+                frame_index = end_frame
+                
+                words_seen += len(words)
+                progress = max(progress, 0.9 * words_seen / max(expected_words or 0, words_seen, 1))
+                progress_callback(progress, f"Generating video frames ({total_seconds:.0f}s so far)...")
+            
+            if not audio_parts:
+                raise Exception("No audio to render")
+            with self.telemetry.span("encode_finish"):
+                out.close()
+            self.telemetry.count("frames_rendered_total", frame_index)
+            
+            progress_callback(0.9, "Adding audio...")
+            with self.telemetry.span("mux_audio"):
+                audio_file = audio_parts[0]
+                if len(audio_parts) > 1:
+                    audio_file = workspace.path("output.mp3")
+                    concat_mp3(audio_parts, audio_file)
+                mux_audio(video_only, audio_file, final_output)
+            
+            if os.path.getsize(final_output) == 0:
+                raise Exception("Output video file is empty")
+            logging.info(f"Video saved to: {final_output}")
+            self._fit_to_budget(final_output, total_seconds, workspace, started, progress_callback)
+            final_output = self._store_video(texts, audio_parts, final_output)
+            progress_callback(1.0, "Done")
+            return final_output
+        
+        except Exception as e:
+            if out is not None:
+                out.abort()
             raise Exception(f"Error generating video: {str(e)}")
+        
+        finally:
+            if background is not None:
+                background.release()
+            if owns_workspace:
+                workspace.cleanup()
+
+    def _render_frames(self, words, frames_per_word, start_frame, end_frame, out, on_frame=None):
+        """Render frames [start_frame, end_frame) of the timeline into an encoder"""
+        background = self._open_background(start_frame)
+        try:
+            render_frames(background, self.caption_renderer, words, frames_per_word, start_frame, end_frame, out, on_frame)
+        finally:
+            background.release()
+
+    def _caption_timeline(self, words, frames_per_word, total_frames):
+        """Collapse the per-frame captions into (start_frame, end_frame, text) events"""
+        events = []
+        for frame_index in range(total_frames):
+            display_text = caption_for_frame(words, frame_index, frames_per_word)
+            text = self.caption_renderer.resolve_text(display_text) if display_text else None
+            if events and events[-1][2] == text and events[-1][1] == frame_index:
+                events[-1][1] = frame_index + 1
+            else:
+                events.append([frame_index, frame_index + 1, text])
+        return [tuple(event) for event in events if event[2]]
+
+    def supports_streaming(self):
+        """Chunk-by-chunk rendering needs ffmpeg and the per-frame engine on a single process"""
+        return (
+            self.render_engine == "frames"
+            and self.render_workers <= 1
+            and self.encoder_backend == "ffmpeg"
+            and shutil.which("ffmpeg") is not None
+        )
+
+    def _use_subtitle_engine(self):
+        """The subtitle engine needs ffmpeg to burn in captions"""
+        return self.render_engine == "subtitles" and shutil.which("ffmpeg") is not None
+
+    def _render_subtitles(self, words, frames_per_word, total_frames, audio_file, final_output, workspace, on_frame):
+        """Compile the caption timeline to ASS and burn it onto the looped background"""
+        background_path = self.background_video
+        prescaled = False
+        if self.background_cache.available():
+            try:
+                background_path, _ = self.background_cache.prepare(self.background_video)
+                prescaled = True
+            except Exception as e:
+                logging.warning(f"Background cache unavailable, scaling in the subtitle pass: {str(e)}")
+
+        script_path = workspace.path("captions.ass")
+        try:
+            events = self._caption_timeline(words, frames_per_word, total_frames)
+            self.subtitle_renderer.write_script(events, script_path)
+            self.subtitle_renderer.render(
+                background_path, audio_file, script_path, final_output, total_frames,
+                prescaled=prescaled, on_frame=on_frame, video_args=self._video_args(total_frames / self.fps)
+            )
+        finally:
+            if os.path.exists(script_path):
+                os.remove(script_path)
+
+    def _use_parallel_render(self, total_frames):
+        """Parallel rendering needs ffmpeg for segment encoding and concatenation"""
+        return (
+            self.render_workers > 1
+            and self.encoder_backend == "ffmpeg"
+            and shutil.which("ffmpeg") is not None
+            and total_frames >= self.render_workers * self.fps
+        )
+
+    def _render_parallel(self, words, frames_per_word, total_frames, audio_file, final_output, workspace, on_progress):
+        """Split the timeline into segments, render them concurrently and join them losslessly"""
+        # Build the background clip once up front so workers don't race to create it
+        if self.background_cache.available():
+            try:
+                self.background_cache.prepare(self.background_video)
+            except Exception as e:
+                logging.warning(f"Background cache unavailable, workers will resize per frame: {str(e)}")
+
+        workers = self.render_workers
+        bounds = [total_frames * i // workers for i in range(workers + 1)]
+        segments = [
+            workspace.path(f"segment_{i:03d}.mp4")
+            for i in range(workers)
+        ]
+
+        try:
+            settings = self._segment_settings()
+            # Every segment gets the whole video's bitrate cap, so the joined file fits the budget
+            video_args = self._video_args(total_frames / self.fps)
+            context = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+                futures = [
+                    pool.submit(
+                        _render_segment, settings, words, frames_per_word, bounds[i], bounds[i + 1], segments[i],
+                        video_args
+                    )
+                    for i in range(workers)
+                ]
+                done_frames = 0
+                for future in as_completed(futures):
+                    done_frames += future.result()
+                    on_progress(done_frames / total_frames)
+
+            concat_segments(segments, audio_file, final_output)
+        finally:
+            for segment in segments:
+                if os.path.exists(segment):
+                    os.remove(segment)
+
+    def _fit_to_budget(self, video_path, duration, workspace, started, progress_callback):
+        """Report the encoded size and time; re-encode in two passes if the file is over max_file_size"""
+        size = os.path.getsize(video_path)
+        budget_mb = self.max_file_size / 1e6
+        self.telemetry.observe("video_budget_ratio", size / self.max_file_size, mode=self.rate_control.mode)
+        if self.rate_control.budgeted and size > self.max_file_size:
+            bitrate = self.rate_control.target_bitrate(duration, self.max_file_size)
+            logging.info(
+                f"{size / 1e6:.1f} MB is over the {budget_mb:.1f} MB budget, "
+                f"re-encoding in two passes at {bitrate // 1000} kb/s"
+            )
+            progress_callback(0.95, "Compressing video...")
+            first_pass = workspace.path("over_budget.mp4")
+            os.replace(video_path, first_pass)
+            with self.telemetry.span("two_pass_encode", speed=self.rate_control.speed):
+                two_pass_encode(first_pass, video_path, bitrate, self.rate_control.speed)
+            os.remove(first_pass)
+            self.telemetry.count("video_reencodes_total")
+            size = os.path.getsize(video_path)
+
+        self.telemetry.count("video_output_bytes_total", size)
+        logging.info(
+            f"Encoded {os.path.basename(video_path)}: {size / 1e6:.1f} MB of {budget_mb:.1f} MB for "
+            f"{duration:.0f}s in {time.perf_counter() - started:.1f}s "
+            f"({self.rate_control.mode}, {self.rate_control.quality} quality, {self.rate_control.speed} speed)"
+        )
 
     def _chunk_into_words(self, text):
         """Split text into word chunks"""
@@ -219,17 +498,8 @@ class VideoGenerator:
 
     def _get_audio_duration(self, audio_file):
         """Get precise audio duration"""
-        try:
-            audio = AudioSegment.from_mp3(audio_file)
-            return len(audio) / 1000.0  # Convert to seconds
-        except Exception as e:
-            logging.error(f"Error getting audio duration: {str(e)}")
-            # Fallback to ffprobe
-            try:
-                probe = os.popen(f'ffprobe -v error -show_entries format=duration -of default=noprint_wrappers=1:nokey=1 "{audio_file}"').read()
-                return float(probe)
-            except:
-                raise Exception("Could not determine audio duration")
+        # Read from frame headers once per file version, never by decoding the audio
+        return get_audio_info(audio_file).duration
 
     def _combine_video_audio(self, video_path, audio_path, output_path):
         """Combine video with audio using ffmpeg"""
@@ -255,59 +525,8 @@ class VideoGenerator:
 
     def _add_text_to_frame(self, frame, text):
         """Add centered text overlay to frame"""
-        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        pil_image = Image.fromarray(frame_rgb)
-        draw = ImageDraw.Draw(pil_image)
-
-        try:
-            font = ImageFont.truetype("arial.ttf", 120)
-        except:
-            font = ImageFont.load_default()
-
-        # Split text into words
-        words = text.split()
-        display_words = []
-        
-        # Process words based on length
-        for word in words[:self.words_per_frame]:
-            if len(word) > 10:
-                # If we already have words to display, return current frame
-                if display_words:
-                    text = ' '.join(display_words)
-                else:
-                    # Show long word alone
-                    text = word
-                break
-            display_words.append(word)
-        
-        if not display_words and not text:
-            text = ' '.join(words[:self.words_per_frame])
-
-        # Calculate text size
-        bbox = draw.textbbox((0, 0), text, font=font)
-        text_width = bbox[2] - bbox[0]
-        text_height = bbox[3] - bbox[1]
-        
-        # Position text at center of frame
-        x = (self.width - text_width) // 2
-        y = (self.height - text_height) // 2
-        
-        # Draw text with outline for better visibility
-        outline_color = 'black'
-        text_color = 'white'
-        outline_width = 4
-
-        # Draw outline
-        for dx in [-outline_width, outline_width]:
-            for dy in [-outline_width, outline_width]:
-                draw.text((x + dx, y + dy), text, font=font, fill=outline_color)
-
-        # Draw main text
-        draw.text((x, y), text, font=font, fill=text_color)
-
-        # Convert back to OpenCV format
-        frame = cv2.cvtColor(np.array(pil_image), cv2.COLOR_RGB2BGR)
-        return frame
+        # Captions are rasterized once and blended onto just their bounding box
+        return self.caption_renderer.render(frame, text)
 
     def _clean_text(self, text):
         """Remove markdown symbols and clean text"""
@@ -337,4 +556,119 @@ class VideoGenerator:
                 os.replace(temp_path, video_path)
             
         except Exception as e:
-            logging.error(f"Error ensuring web compatibility: {str(e)}")
\ No newline at end of file
+            logging.error(f"Error ensuring web compatibility: {str(e)}")
+
+def caption_sizes(width):
+    """Caption font size and outline width; tuned for 1080 pixels wide, smaller profiles scale down"""
+    return round(120 * width / 1080), max(1, round(4 * width / 1080))
+
+def fit_background_frame(frame, width, height):
+    """Scale a background frame to cover width x height and center it, without stretching"""
+    if frame is None:
+        return None
+
+    # Get original dimensions
+    h, w = frame.shape[:2]
+
+    # Calculate scaling factor to maintain aspect ratio
+    scale = max(width/w, height/h)
+
+    # Calculate new dimensions
+    new_w = int(w * scale)
+    new_h = int(h * scale)
+
+    # Resize frame maintaining aspect ratio
+    resized = cv2.resize(frame, (new_w, new_h))
+
+    # Create black canvas of target size
+    canvas = np.zeros((height, width, 3), dtype=np.uint8)
+
+    # Calculate position to center the frame
+    x_offset = (width - new_w) // 2
+    y_offset = (height - new_h) // 2
+
+    # Copy the resized frame onto the canvas
+    if x_offset < 0:
+        # Crop width if too wide
+        start_x = -x_offset
+        canvas[:, :] = resized[y_offset:y_offset+height, start_x:start_x+width]
+    else:
+        # Center if too narrow
+        canvas[y_offset:y_offset+new_h, x_offset:x_offset+new_w] = resized
+
+    return canvas
+
+def caption_for_frame(words, frame_index, frames_per_word):
+    """Caption text shown on a given frame of the timeline, or None"""
+    total_words = len(words)
+
+    # Update word index based on precise timing
+    word_index = min(int(frame_index / frames_per_word), total_words - 1)
+
+    # Get words to display
+    current_words = []
+    if word_index < total_words:
+        current_word = words[word_index]
+        if len(current_word) > 10:
+            # Show long word alone
+            current_words = [current_word]
+        else:
+            # Check next word if available
+            current_words = [current_word]
+            if word_index + 1 < total_words:
+                next_word = words[word_index + 1]
+                if len(next_word) <= 10:
+                    current_words.append(next_word)
+
+    if current_words:
+        return ' '.join(current_words)
+    return None
+
+def open_background(background_cache, background_video, width, height, start_frame=0):
+    """Open a looping frame source already sized to width x height"""
+    if background_cache.available():
+        try:
+            return background_cache.open(background_video, start_frame)
+        except Exception as e:
+            logging.warning(f"Background cache unavailable, resizing per frame: {str(e)}")
+    return CaptureReader(background_video, lambda frame: fit_background_frame(frame, width, height), start_frame)
+
+def render_frames(background, caption_renderer, words, frames_per_word, start_frame, end_frame, out, on_frame=None):
+    """Render frames [start_frame, end_frame) of the timeline from an open background into an encoder"""
+    for frame_index in range(start_frame, end_frame):
+        # Background frames arrive already fitted to 9:16
+        frame = background.read()
+        
+        # Add text to frame
+        display_text = caption_for_frame(words, frame_index, frames_per_word)
+        if display_text:
+            frame = caption_renderer.render(frame, display_text)
+        
+        out.write(frame)
+
+        # Update progress
+        if on_frame:
+            on_frame(frame_index - start_frame + 1)
+
+def _render_segment(settings, words, frames_per_word, start_frame, end_frame, segment_path, video_args=None):
+    """Worker entry point: render one slice of the timeline to its own video file"""
+    width, height, fps = settings["width"], settings["height"], settings["fps"]
+    font_size, outline_width = caption_sizes(width)
+    caption_renderer = CaptionRenderer(
+        width, height, settings["words_per_frame"], font_size=font_size, outline_width=outline_width
+    )
+    background_cache = BackgroundCache(settings["background_cache_dir"], width, height, fps)
+
+    out = FFmpegPipeEncoder(segment_path, width, height, fps, video_args=video_args)
+    background = None
+    try:
+        background = open_background(background_cache, settings["background_video"], width, height, start_frame)
+        render_frames(background, caption_renderer, words, frames_per_word, start_frame, end_frame, out)
+    except Exception:
+        out.abort()
+        raise
+    finally:
+        if background is not None:
+            background.release()
+    out.close()
+    return end_frame - start_frame